@@ -3,6 +3,10 @@
 
 Create a system user (wrapper around `useradd`) with safe defaults.
 
+When python-libuser is installed the account, password and group
+memberships are written in-process in one pass; otherwise the script
+falls back to `useradd` followed by `chpasswd`.
+
 This script is a minimal, non-destructive helper. By default it will print
 the commands it would run. Use `--apply` to actually execute system changes.
 
@@ -12,13 +16,17 @@ Usage examples:
 """
 from __future__ import annotations
 import argparse
-import random
 import secrets
 import shlex
 import string
 import subprocess
 import sys
 
+try:
+    import libuser
+except ImportError:
+    libuser = None  # type: ignore
+
 
 def run(cmd: list[str], dry_run: bool) -> int:
     print("+ "+shlex.join(cmd))
@@ -28,9 +36,46 @@ def run(cmd: list[str], dry_run: bool) -> int:
     return p.returncode
 
 
+PASSWORD_ALPHABET = (string.ascii_letters + string.digits).encode("ascii")
+# Map byte b -> alphabet[b % 62] and drop bytes >= 248 (rejection sampling keeps it unbiased).
+_LIMIT = 256 - 256 % len(PASSWORD_ALPHABET)
+_TABLE = bytes(PASSWORD_ALPHABET[b % len(PASSWORD_ALPHABET)] for b in range(_LIMIT)) + bytes(256 - _LIMIT)
+_REJECT = bytes(range(_LIMIT, 256))
+
+
 def generate_password(length: int = 16) -> str:
-    alphabet = string.ascii_letters + string.digits
-    return ''.join(secrets.choice(alphabet) for _ in range(length))
+    out = b""
+    while len(out) < length:
+        out += secrets.token_bytes(length * 2).translate(_TABLE, _REJECT)
+    return out[:length].decode("ascii")
+
+
+def create_with_libuser(username: str, shell: str, groups: list[str], create_home: bool, password: str | None) -> int:
+    admin = libuser.admin()
+    if admin.lookupUserByName(username) is not None:
+        print(f"User {username} already exists", file=sys.stderr)
+        return 9  # same code useradd uses for an existing user
+    # Resolve groups first so a typo fails before anything is written, like useradd -G.
+    group_ents = []
+    for name in groups:
+        group = admin.lookupGroupByName(name)
+        if group is None:
+            print(f"Group {name} does not exist", file=sys.stderr)
+            return 6  # useradd: specified group doesn't exist
+        group_ents.append(group)
+    try:
+        user = admin.initUser(username)
+        user[libuser.LOGINSHELL] = shell
+        admin.addUser(user, mkhomedir=create_home)
+        if password:
+            admin.setpassUser(user, password, False)
+        for group in group_ents:
+            group.add(libuser.MEMBERNAME, username)
+            admin.modifyGroup(group)
+    except RuntimeError as e:
+        print(f"libuser failed: {e}", file=sys.stderr)
+        return 1
+    return 0
 
 
 def main() -> int:
@@ -71,11 +116,6 @@ def main() -> int:
             continue
         cleaned_cmd.append(part)
 
-    ret = run(cleaned_cmd, dry_run)
-    if ret != 0:
-        print("useradd failed", file=sys.stderr)
-        return ret
-
     # Handle password
     password_used = None
     if args.random_password:
@@ -83,14 +123,31 @@ def main() -> int:
     elif args.password:
         password_used = args.password
 
-    if password_used:
-        chpasswd = f"{username}:{password_used}"
-        print("+ chpasswd (hidden) => <masked>")
+    if libuser is not None:
+        # One in-process write of passwd/shadow/group instead of useradd + chpasswd.
+        groups = [g for g in (args.groups or "").split(",") if g] + (["sudo"] if args.sudo else [])
+        print(
+            f"+ libuser add {username} shell={args.shell} home={'no' if args.no_create_home else 'yes'}"
+            f" groups={','.join(groups) or '-'} password={'<masked>' if password_used else '-'}"
+        )
         if not dry_run:
-            p = subprocess.run(["chpasswd"], input=chpasswd, text=True)
-            if p.returncode != 0:
-                print("chpasswd failed", file=sys.stderr)
-                return p.returncode
+            ret = create_with_libuser(username, args.shell, groups, not args.no_create_home, password_used)
+            if ret != 0:
+                return ret
+    else:
+        ret = run(cleaned_cmd, dry_run)
+        if ret != 0:
+            print("useradd failed", file=sys.stderr)
+            return ret
+
+        if password_used:
+            chpasswd = f"{username}:{password_used}"
+            print("+ chpasswd (hidden) => <masked>")
+            if not dry_run:
+                p = subprocess.run(["chpasswd"], input=chpasswd, text=True)
+                if p.returncode != 0:
+                    print("chpasswd failed", file=sys.stderr)
+                    return p.returncode
 
     if args.apply and args.sudo:
         # Ensure sudo group exists and user is in it (useradd handled group membership)
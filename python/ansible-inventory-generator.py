@@ -4,16 +4,19 @@ import boto3
 
 def generate_inventory(region='us-east-1'):
     ec2 = boto3.client('ec2', region_name=region)
-    res = ec2.describe_instances()
-    hosts = []
-    for r in res['Reservations']:
-        for inst in r['Instances']:
-            if inst.get('State', {}).get('Name') == 'running':
-                hosts.append(inst['PublicIpAddress'])
+    # Filter to running instances server-side and page through large fleets.
+    pages = ec2.get_paginator('describe_instances').paginate(
+        Filters=[{'Name': 'instance-state-name', 'Values': ['running']}]
+    )
+    hosts = [
+        inst['PublicIpAddress']
+        for page in pages
+        for r in page['Reservations']
+        for inst in r['Instances']
+        if inst.get('PublicIpAddress')
+    ]
     with open('inventory.ini', 'w') as f:
-        f.write('[aws-hosts]\n')
-        for h in hosts:
-            f.write(f"{h}\n")
+        f.write('[aws-hosts]\n' + ''.join(f"{h}\n" for h in hosts))
     print("Inventory generated: inventory.ini")
 
 if __name__ == "__main__":
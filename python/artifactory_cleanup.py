@@ -7,7 +7,8 @@ This script uses the Artifactory AQL API and works with either an API key
 (`X-JFrog-Art-Api` environment variable) or basic auth via `ART_USER` and
 `ART_PASSWORD` environment variables.
 
-Dry-run is the default; pass `--apply` to perform deletions.
+Dry-run is the default; pass `--apply` to perform deletions. Deletions run
+concurrently (`--workers`), each worker reusing one keep-alive connection.
 
 Usage:
   python artifactory_cleanup.py --url https://artifactory.example.com --repo my-repo --days 90
@@ -15,12 +16,26 @@ Usage:
 """
 from __future__ import annotations
 import argparse
+import collections
 import datetime
+import http.client
 import json
 import os
 import sys
-import urllib.request
+import threading
 import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Iterator
+
+try:
+    import ijson
+except ImportError:
+    ijson = None  # type: ignore
+
+# One persistent HTTP(S) connection per worker thread, so TLS setup is paid once per worker.
+_local = threading.local()
 
 
 def build_aql(repo: str, iso_before: str, path_prefix: str | None) -> str:
@@ -34,22 +49,84 @@ def build_aql(repo: str, iso_before: str, path_prefix: str | None) -> str:
     return aql
 
 
-def post_aql(base_url: str, aql: str, headers: dict) -> dict:
+def post_aql(base_url: str, aql: str, headers: dict):
+    """POST the AQL query and return the open response (raises HTTPError on failure)."""
     url = base_url.rstrip("/") + "/api/search/aql"
     data = aql.encode("utf-8")
     req = urllib.request.Request(url, data=data, headers=headers or {}, method="POST")
-    with urllib.request.urlopen(req) as resp:
-        body = resp.read()
-        return json.loads(body)
+    return urllib.request.urlopen(req)
+
+
+def iter_results(resp: BinaryIO) -> Iterator[dict]:
+    # With ijson, items are parsed as they arrive instead of after the whole body is read.
+    if ijson is not None:
+        yield from ijson.items(resp, "results.item")
+    else:
+        yield from json.load(resp).get("results", [])
+
+
+def _connection(url: urllib.parse.SplitResult, fresh: bool = False) -> http.client.HTTPConnection:
+    conn = getattr(_local, "conn", None)
+    if conn is None or fresh:
+        if conn is not None:
+            conn.close()
+        cls = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        proxy = _proxy_for(url)
+        if proxy is None:
+            conn = cls(url.netloc, timeout=60)
+        elif url.scheme == "https":
+            # CONNECT through the proxy, then TLS to the real host
+            conn = cls(proxy.netloc, timeout=60)
+            conn.set_tunnel(url.netloc)
+        else:
+            conn = http.client.HTTPConnection(proxy.netloc, timeout=60)
+        _local.conn = conn
+    return conn
+
+
+def _proxy_for(url: urllib.parse.SplitResult) -> urllib.parse.SplitResult | None:
+    # Same HTTP(S)_PROXY / NO_PROXY handling urllib applies to the AQL request.
+    proxy = urllib.request.getproxies().get(url.scheme)
+    if not proxy or urllib.request.proxy_bypass(url.hostname or ""):
+        return None
+    return urllib.parse.urlsplit(proxy if "://" in proxy else "http://" + proxy)
+
+
+def _drop_connection() -> None:
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+    _local.conn = None
 
 
 def delete_item(base_url: str, repo: str, path: str, name: str, headers: dict) -> None:
     # DELETE https://.../{repo}/{path}/{name}
     # path may be empty
     full_path = "/".join([p for p in [base_url.rstrip("/"), repo, path, name] if p != ""])
-    req = urllib.request.Request(full_path, headers=headers or {}, method="DELETE")
-    with urllib.request.urlopen(req) as resp:
-        resp.read()
+    url = urllib.parse.urlsplit(full_path)
+    target = urllib.parse.quote(url.path, safe="/")
+    if url.scheme == "http" and _proxy_for(url) is not None:
+        # plain HTTP proxies take the absolute URL as the request target
+        target = f"http://{url.netloc}{target}"
+    for attempt in range(2):
+        conn = _connection(url, fresh=attempt > 0)
+        try:
+            conn.request("DELETE", target, headers=headers or {})
+            resp = conn.getresponse()
+            resp.read()
+            break
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # the server may close an idle keep-alive connection; retry once on a new one
+            _drop_connection()
+            if attempt:
+                raise
+        except Exception:
+            # timeouts, TLS errors, short reads: the connection is mid-request and unusable
+            _drop_connection()
+            raise
+    # Redirects are not followed, as urllib refuses to redirect a DELETE; they count as failures.
+    if resp.status >= 300:
+        raise urllib.error.HTTPError(full_path, resp.status, resp.reason, resp.headers, None)
 
 
 def main() -> int:
@@ -59,6 +136,7 @@ def main() -> int:
     parser.add_argument("--days", type=int, required=True, help="Delete artifacts older than this many days")
     parser.add_argument("--path-prefix", help="Limit to artifacts under this path prefix")
     parser.add_argument("--apply", action="store_true", help="Perform deletions (default is dry-run)")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent delete requests (default 16)")
     args = parser.parse_args()
 
     base_url = args.url or os.environ.get("ARTIFACTORY_URL")
@@ -88,7 +166,7 @@ def main() -> int:
 
     aql = build_aql(args.repo, iso_cutoff, args.path_prefix)
     try:
-        res = post_aql(base_url, aql, headers)
+        resp = post_aql(base_url, aql, headers)
     except urllib.error.HTTPError as e:
         print(f"AQL query failed: {e.code} {e.reason}", file=sys.stderr)
         try:
@@ -97,40 +175,64 @@ def main() -> int:
             pass
         return 3
 
-    results = res.get("results", [])
-    if not results:
-        print("No artifacts found matching criteria.")
-        return 0
+    def delete_one(item: dict):
+        try:
+            delete_item(base_url, item.get("repo"), item.get("path", ""), item.get("name"), headers)
+            return None
+        except urllib.error.HTTPError as e:
+            return f"{e.code} {e.reason}"
+        except Exception as e:
+            return str(e)
 
-    print(f"Found {len(results)} artifacts older than {args.days} days in repo {args.repo}.")
-    for item in results:
+    def report(item: dict, err) -> int:
         repo = item.get("repo")
         path = item.get("path", "")
         name = item.get("name")
-        modified = item.get("modified")
-        display = f"{repo}/{path}/{name}" if path else f"{repo}/{name}"
-        print(display + f"  (modified: {modified})")
+        if err is None:
+            print(f"Deleted: {repo}/{path}/{name}" if path else f"Deleted: {repo}/{name}")
+            return 0
+        print(f"Failed to delete {repo}/{path}/{name}: {err}", file=sys.stderr)
+        return 1
 
+    # Results stream from the AQL response straight into the delete pool; a bounded
+    # window of in-flight deletes keeps memory flat and output in result order.
+    found = 0
+    errors = 0
+    window: collections.deque = collections.deque()
+    max_in_flight = max(1, args.workers) * 4
+    pool = ThreadPoolExecutor(max_workers=max(1, args.workers)) if args.apply else None
+    try:
+        with resp:
+            for item in iter_results(resp):
+                found += 1
+                repo = item.get("repo")
+                path = item.get("path", "")
+                name = item.get("name")
+                modified = item.get("modified")
+                display = f"{repo}/{path}/{name}" if path else f"{repo}/{name}"
+                print(display + f"  (modified: {modified})")
+                if pool is None:
+                    continue
+                window.append((item, pool.submit(delete_one, item)))
+                if len(window) >= max_in_flight:
+                    done, fut = window.popleft()
+                    errors += report(done, fut.result())
+        while window:
+            done, fut = window.popleft()
+            errors += report(done, fut.result())
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if not found:
+        print("No artifacts found matching criteria.")
+        return 0
+
+    print(f"Found {found} artifacts older than {args.days} days in repo {args.repo}.")
     if not args.apply:
         print("Dry-run; no deletions performed. Re-run with --apply to delete.")
         return 0
 
-    # perform deletions
-    errors = 0
-    for item in results:
-        repo = item.get("repo")
-        path = item.get("path", "")
-        name = item.get("name")
-        try:
-            delete_item(base_url, repo, path, name, headers)
-            print(f"Deleted: {repo}/{path}/{name}" if path else f"Deleted: {repo}/{name}")
-        except urllib.error.HTTPError as e:
-            print(f"Failed to delete {repo}/{path}/{name}: {e.code} {e.reason}", file=sys.stderr)
-            errors += 1
-        except Exception as e:
-            print(f"Failed to delete {repo}/{path}/{name}: {e}", file=sys.stderr)
-            errors += 1
-
     if errors:
         print(f"Completed with {errors} errors", file=sys.stderr)
         return 4
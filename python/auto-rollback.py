@@ -15,11 +15,24 @@ import os
 import subprocess
 import sys
 import time
-from typing import Optional
+from typing import Callable, Optional
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None  # type: ignore
+    flags = None  # type: ignore
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None  # type: ignore
 
 
 LOG = logging.getLogger(__name__)
 
+READ_SIZE = 64 * 1024
+
 
 def run_cmd(cmd: list[str], apply: bool) -> int:
     LOG.info("Planned command: %s", " ".join(cmd))
@@ -34,44 +47,103 @@ def run_cmd(cmd: list[str], apply: bool) -> int:
         return 127
 
 
-def monitor_log_file(path: str, trigger_text: str, rollback_cmd: Optional[list[str]], apply: bool, poll: float = 1.0) -> int:
+def build_matcher(triggers: list[str]) -> Callable[[bytes], Optional[str]]:
+    """Return a function that finds the first trigger phrase in a chunk of log bytes.
+
+    Uses an Aho-Corasick automaton (one pass for all phrases) when pyahocorasick
+    is installed, otherwise a substring check per phrase.
+    """
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for t in triggers:
+            automaton.add_word(t, t)
+        automaton.make_automaton()
+
+        def match(chunk: bytes) -> Optional[str]:
+            for _, found in automaton.iter(chunk.decode("utf-8", errors="replace")):
+                return found
+            return None
+
+        return match
+
+    needles = [(t, t.encode("utf-8")) for t in triggers]
+
+    def match(chunk: bytes) -> Optional[str]:
+        for t, b in needles:
+            if b in chunk:
+                return t
+        return None
+
+    return match
+
+
+def monitor_log_file(path: str, triggers: list[str], rollback_cmd: Optional[list[str]], apply: bool, poll: float = 1.0) -> int:
     if not os.path.exists(path):
         LOG.error("Log file does not exist: %s", path)
         return 2
 
-    with open(path, "r", encoding="utf-8", errors="replace") as fh:
-        fh.seek(0, os.SEEK_END)
-        while True:
-            line = fh.readline()
-            if not line:
-                time.sleep(poll)
-                continue
-            if trigger_text in line:
-                LOG.warning("Trigger text detected in log: %s", trigger_text)
-                if rollback_cmd:
-                    return run_cmd(rollback_cmd, apply)
-                else:
-                    LOG.error("No rollback command provided; cannot perform rollback")
-                    return 3
+    # With inotify the loop sleeps until the file is written; otherwise poll every `poll` seconds.
+    inot = None
+    if INotify is not None:
+        inot = INotify()
+        inot.add_watch(path, flags.MODIFY)
+    else:
+        LOG.debug("inotify_simple not installed; polling every %.1fs", poll)
+
+    match = build_matcher(triggers)
+    # Keep enough of the previous chunk that a phrase split across two reads is still found.
+    overlap = max(len(t.encode("utf-8")) for t in triggers) - 1
+
+    try:
+        with open(path, "rb") as fh:
+            fh.seek(0, os.SEEK_END)
+            tail = b""
+            while True:
+                chunk = fh.read(READ_SIZE)
+                if not chunk:
+                    if inot is not None:
+                        # Events queued since the last read return immediately, so no write is missed.
+                        inot.read()
+                    else:
+                        time.sleep(poll)
+                    continue
+                data = tail + chunk
+                found = match(data)
+                tail = data[-overlap:] if overlap > 0 else b""
+                if found is not None:
+                    LOG.warning("Trigger text detected in log: %s", found)
+                    if rollback_cmd:
+                        return run_cmd(rollback_cmd, apply)
+                    else:
+                        LOG.error("No rollback command provided; cannot perform rollback")
+                        return 3
+    finally:
+        if inot is not None:
+            inot.close()
 
 
 def main() -> int:
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
     parser = argparse.ArgumentParser(description="Auto rollback helper")
     parser.add_argument("--log-file", default=os.environ.get("DEPLOY_LOG", "/var/log/deploy.log"), help="Deployment log file to monitor")
-    parser.add_argument("--trigger", default=os.environ.get("DEPLOY_FAILURE_TRIGGER", "deployment failed"), help="Text to watch for in logs that triggers rollback")
+    parser.add_argument("--trigger", action="append", help="Text to watch for in logs that triggers rollback (repeatable; default: $DEPLOY_FAILURE_TRIGGER or 'deployment failed')")
     parser.add_argument("--rollback-cmd", help="Rollback command to run (shell form). Example: '/usr/local/bin/rollback.sh arg'")
     parser.add_argument("--apply", action="store_true", help="Actually execute rollback command (default: dry-run)")
     parser.add_argument("--once", action="store_true", help="Exit after first match and (optionally) rollback")
     args = parser.parse_args()
 
+    triggers = [t for t in (args.trigger or [os.environ.get("DEPLOY_FAILURE_TRIGGER", "deployment failed")]) if t]
+    if not triggers:
+        LOG.error("At least one non-empty --trigger is required")
+        return 2
+
     rollback_cmd = None
     if args.rollback_cmd:
         # simple split; if complex commands are needed user can pass a small wrapper script
         rollback_cmd = args.rollback_cmd.split()
 
     try:
-        rc = monitor_log_file(args.log_file, args.trigger, rollback_cmd, args.apply)
+        rc = monitor_log_file(args.log_file, triggers, rollback_cmd, args.apply)
         if args.once:
             return rc
         # otherwise continue running until interrupted
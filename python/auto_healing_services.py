@@ -27,6 +27,28 @@ def is_active(service: str) -> bool:
     return p.returncode == 0
 
 
+def get_states(services: list[str]) -> dict[str, tuple[str, str]]:
+    """Fetch (ActiveState, SubState) for all services with one `systemctl show` call.
+
+    show prints one blank-line separated record per unit, in argument order.
+    Falls back to per-service `is-active` if the output cannot be aligned.
+    """
+    p = subprocess.run(
+        ["systemctl", "show", "--property=ActiveState", "--property=SubState", *services],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    records = p.stdout.strip("\n").split("\n\n")
+    if p.returncode != 0 or len(records) != len(services):
+        return {svc: ("active", "unknown") if is_active(svc) else ("inactive", "unknown") for svc in services}
+    states: dict[str, tuple[str, str]] = {}
+    for svc, rec in zip(services, records):
+        props = dict(line.split("=", 1) for line in rec.splitlines() if "=" in line)
+        states[svc] = (props.get("ActiveState", "unknown"), props.get("SubState", "unknown"))
+    return states
+
+
 def restart(service: str) -> int:
     return subprocess.run(["systemctl", "restart", service]).returncode
 
@@ -66,13 +88,15 @@ def main() -> int:
         print("No valid services parsed; exiting.")
         return 0
 
+    states = get_states(services)
     for svc in services:
-        active = is_active(svc)
-        if active:
-            print(f"OK: {svc} is active")
+        active, sub = states.get(svc, ("unknown", "unknown"))
+        # "reloading" still counts as active, matching `systemctl is-active`.
+        if active in ("active", "reloading"):
+            print(f"OK: {svc} is active ({sub})")
             continue
 
-        print(f"NOT ACTIVE: {svc}")
+        print(f"NOT ACTIVE: {svc} ({active}/{sub})")
         print(status(svc))
         if args.apply:
             print(f"Attempting restart: {svc}")
@@ -5,7 +5,7 @@ aws-cloudtrail-trail-config-auditor.py
 Purpose:
   Audit AWS CloudTrail trails for best practices and misconfigurations:
   - Not multi-region
-  - Not logging management events
+  - Not logging management events (basic or advanced event selectors)
   - Not enabled
   - Not encrypted with KMS
   - Not sending to S3 or S3 bucket not versioned
@@ -14,8 +14,8 @@ Purpose:
 
 Features:
   - Multi-region scan
-  - JSON output option
-  - Name filter (--name-filter)
+  - JSON output option (--json, or line-delimited with --ndjson)
+  - Name filter (--name-filter) repeatable
   - Tag filter (--required-tag Key=Value) repeatable
 
 Permissions Required:
@@ -31,17 +31,28 @@ Exit Codes:
 """
 import argparse
 import boto3
+import functools
+import itertools
 import json
+import re
 import sys
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
+# Larger pool for concurrent calls; adaptive retries back off client-side when throttled.
+BOTO_CFG = Config(max_pool_connections=50, retries={'mode': 'adaptive', 'max_attempts': 10},
+                  user_agent_extra='audit-scripts/1.0')
+
 
 def parse_args():
     p = argparse.ArgumentParser(description="Audit CloudTrail trail configuration best practices")
     p.add_argument("--profile", help="AWS profile name")
-    p.add_argument("--name-filter", help="Substring filter on trail name")
+    p.add_argument("--name-filter", action="append", help="Substring filter on trail name (repeat to match any)")
     p.add_argument("--required-tag", action="append", help="Tag filter Key=Value (repeat)")
     p.add_argument("--json", action="store_true", help="JSON output")
+    p.add_argument("--ndjson", action="store_true", help="One JSON object per trail, written as audited")
+    p.add_argument("--workers", type=int, default=16, help="Trails audited concurrently (default 16)")
     return p.parse_args()
 
 
@@ -70,13 +81,25 @@ def matches_tags(trail_tags: Dict[str, str], needed: Dict[str, str]):
     return True
 
 
-def get_trail_tags(client, arn: str):
-    try:
-        resp = client.list_tags(ResourceIdList=[arn])
-        tags = resp.get('ResourceTagList', [{}])[0].get('TagsList', [])
-        return {t['Key']: t['Value'] for t in tags}
-    except Exception:
-        return {}
+def get_trail_tags(client, arns: List[str]) -> Dict[str, Dict[str, str]]:
+    # ListTags accepts up to 20 trail ARNs per call.
+    out: Dict[str, Dict[str, str]] = {}
+    for i in range(0, len(arns), 20):
+        batch = arns[i:i + 20]
+        try:
+            tag_lists = client.list_tags(ResourceIdList=batch).get('ResourceTagList', [])
+        except Exception:
+            # One rejected ARN (e.g. a shadow trail from another region) fails the whole
+            # batch; retry its ARNs singly so the others keep their tags.
+            tag_lists = []
+            for arn in batch:
+                try:
+                    tag_lists.extend(client.list_tags(ResourceIdList=[arn]).get('ResourceTagList', []))
+                except Exception:
+                    continue
+        for res in tag_lists:
+            out[res.get('ResourceId')] = {t['Key']: t['Value'] for t in res.get('TagsList', [])}
+    return out
 
 
 def get_bucket_versioning(s3, bucket: str):
@@ -87,12 +110,104 @@ def get_bucket_versioning(s3, bucket: str):
         return False
 
 
+def has_management_events(ct, t: Dict[str, Any]) -> bool:
+    # Without custom selectors a trail uses the default selector, which logs all management events.
+    if t.get('HasCustomEventSelectors') is False:
+        return True
+    selectors = ct.get_event_selectors(TrailName=t.get('Name'))
+    for sel in selectors.get('EventSelectors', []):
+        if sel.get('IncludeManagementEvents'):
+            return True
+    # Advanced selectors log management events when one matches eventCategory = Management.
+    for sel in selectors.get('AdvancedEventSelectors', []):
+        for fs in sel.get('FieldSelectors', []):
+            if fs.get('Field') == 'eventCategory' and 'Management' in fs.get('Equals', []):
+                return True
+    return False
+
+
+def audit_trail(t: Dict[str, Any], tags: Dict[str, str], ct, bucket_versioned) -> Dict[str, Any]:
+    name = t.get('Name')
+    status = ct.get_trail_status(Name=name)
+    versioned = bucket_versioned(t['S3BucketName']) if t.get('S3BucketName') else None
+    findings = []
+    if not t.get('IsMultiRegionTrail'):
+        findings.append('NOT_MULTI_REGION')
+    if not t.get('LogFileValidationEnabled'):
+        findings.append('NO_LOG_FILE_VALIDATION')
+    if not t.get('KmsKeyId'):
+        findings.append('NO_KMS_ENCRYPTION')
+    if not t.get('CloudWatchLogsLogGroupArn'):
+        findings.append('NO_CLOUDWATCH_LOGS')
+    if not t.get('S3BucketName'):
+        findings.append('NO_S3_BUCKET')
+    elif not versioned:
+        findings.append('S3_BUCKET_NOT_VERSIONED')
+    if not status.get('IsLogging'):
+        findings.append('NOT_LOGGING')
+    if not has_management_events(ct, t):
+        findings.append('NO_MANAGEMENT_EVENTS')
+    return {
+        'name': name,
+        'arn': t.get('TrailARN'),
+        'findings': findings,
+        'tags': tags,
+        'is_logging': status.get('IsLogging'),
+        'multi_region': t.get('IsMultiRegionTrail'),
+        'log_file_validation': t.get('LogFileValidationEnabled'),
+        'kms_key_id': t.get('KmsKeyId'),
+        'cloudwatch_logs': t.get('CloudWatchLogsLogGroupArn'),
+        's3_bucket': t.get('S3BucketName'),
+        's3_bucket_versioned': versioned,
+    }
+
+
+def print_table(header: List[str], rows, sample: int = 1000) -> int:
+    """Stream rows as an aligned table; column widths come from the first `sample` rows."""
+    rows = iter(rows)
+    head = [[str(c) for c in header]]
+    head.extend([str(c) for c in row] for row in itertools.islice(rows, sample))
+    if len(head) == 1:
+        return 0
+    widths = [0] * len(header)
+    for row in head:
+        for j, c in enumerate(row):
+            if len(c) > widths[j]:
+                widths[j] = len(c)
+    fmt = '  '.join(f'{{:<{w}}}' for w in widths)
+    out = sys.stdout
+    out.write(fmt.format(*head[0]) + '\n' + '  '.join('-' * w for w in widths) + '\n')
+    out.write(''.join(fmt.format(*row) + '\n' for row in head[1:]))
+    count = len(head) - 1
+    buf = []
+    for row in rows:
+        buf.append(fmt.format(*[str(c) for c in row]) + '\n')
+        count += 1
+        if len(buf) >= 256:
+            out.write(''.join(buf))
+            buf.clear()
+    out.write(''.join(buf))
+    return count
+
+
+def write_ndjson(records) -> int:
+    count = 0
+    for rec in records:
+        json.dump(rec, sys.stdout, default=str)
+        sys.stdout.write('\n')
+        count += 1
+    return count
+
+
 def main():
     args = parse_args()
     sess = session(args.profile)
-    ct = sess.client('cloudtrail')
-    s3 = sess.client('s3')
+    # Clients are thread-safe once built, so the workers share these two.
+    ct = sess.client('cloudtrail', config=BOTO_CFG)
+    s3 = sess.client('s3', config=BOTO_CFG)
     needed_tags = parse_tag_filters(args.required_tag)
+    # Trails often share a bucket; look each bucket up once.
+    bucket_versioned = functools.lru_cache(maxsize=None)(lambda bucket: get_bucket_versioning(s3, bucket))
 
     try:
         trails = ct.describe_trails()['trailList']
@@ -100,77 +215,38 @@ def main():
         print(f"ERROR: {e}", file=sys.stderr)
         sys.exit(1)
 
-    results = []
-    for t in trails:
-        name = t.get('Name')
-        arn = t.get('TrailARN')
-        if args.name_filter and args.name_filter not in name:
-            continue
-        tags = get_trail_tags(ct, arn)
-        if needed_tags and not matches_tags(tags, needed_tags):
-            continue
-        status = ct.get_trail_status(Name=name)
-        selectors = ct.get_event_selectors(TrailName=name)
-        findings = []
-        if not t.get('IsMultiRegionTrail'):
-            findings.append('NOT_MULTI_REGION')
-        if not t.get('LogFileValidationEnabled'):
-            findings.append('NO_LOG_FILE_VALIDATION')
-        if not t.get('KmsKeyId'):
-            findings.append('NO_KMS_ENCRYPTION')
-        if not t.get('CloudWatchLogsLogGroupArn'):
-            findings.append('NO_CLOUDWATCH_LOGS')
-        if not t.get('S3BucketName'):
-            findings.append('NO_S3_BUCKET')
-        else:
-            if not get_bucket_versioning(s3, t['S3BucketName']):
-                findings.append('S3_BUCKET_NOT_VERSIONED')
-        if not status.get('IsLogging'):
-            findings.append('NOT_LOGGING')
-        # Check event selectors for management events
-        mgmt_events = False
-        for sel in selectors.get('EventSelectors', []):
-            if sel.get('IncludeManagementEvents'):
-                mgmt_events = True
-        if not mgmt_events:
-            findings.append('NO_MANAGEMENT_EVENTS')
-        rec = {
-            'name': name,
-            'arn': arn,
-            'findings': findings,
-            'tags': tags,
-            'is_logging': status.get('IsLogging'),
-            'multi_region': t.get('IsMultiRegionTrail'),
-            'log_file_validation': t.get('LogFileValidationEnabled'),
-            'kms_key_id': t.get('KmsKeyId'),
-            'cloudwatch_logs': t.get('CloudWatchLogsLogGroupArn'),
-            's3_bucket': t.get('S3BucketName'),
-            's3_bucket_versioned': get_bucket_versioning(s3, t['S3BucketName']) if t.get('S3BucketName') else None,
-        }
-        results.append(rec)
-
-    if args.json:
-        print(json.dumps({'results': results}, indent=2))
-        return 0
+    if args.name_filter:
+        # Several --name-filter values match if any of them appears in the name.
+        name_re = re.compile('|'.join(map(re.escape, args.name_filter)))
+        trails = [t for t in trails if name_re.search(t.get('Name'))]
+    # Tags are only needed for filtering or the JSON records; the table never shows them.
+    tags_by_arn = get_trail_tags(ct, [t.get('TrailARN') for t in trails]) if needed_tags or args.json or args.ndjson else {}
+    work = [(t, tags_by_arn.get(t.get('TrailARN'), {})) for t in trails]
+    if needed_tags:
+        work = [(t, tags) for t, tags in work if matches_tags(tags, needed_tags)]
 
-    if not results:
-        print('No CloudTrail trails found.')
-        return 0
+    def audit(item):
+        return audit_trail(item[0], item[1], ct, bucket_versioned)
 
-    header = ["Name", "Findings"]
-    rows = [header]
-    for r in results:
-        rows.append([r['name'], ','.join(r['findings'])])
-    widths = [max(len(str(row[i])) for row in rows) for i in range(len(header))]
-    for i, row in enumerate(rows):
-        line = '  '.join(str(cell).ljust(widths[j]) for j, cell in enumerate(row))
-        if i == 0:
-            print(line)
-            print('  '.join('-' * w for w in widths))
-        else:
-            print(line)
-    return 0
+    # Per-trail lookups are network-bound, so threads overlap them; map() keeps trail order.
+    with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(work)))) as pool:
+        results = pool.map(audit, work)
+
+        if args.ndjson:
+            write_ndjson(results)
+            return 0
+
+        if args.json:
+            json.dump({'results': list(results)}, sys.stdout, indent=2, default=str)
+            sys.stdout.write('\n')
+            return 0
 
+        header = ["Name", "Findings"]
+        shown = print_table(header, ([r['name'], ','.join(r['findings'])] for r in results))
+
+    if not shown:
+        print('No CloudTrail trails found.')
+    return 0
 
 if __name__ == '__main__':
     try:
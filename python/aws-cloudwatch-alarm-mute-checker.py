@@ -14,17 +14,18 @@ Flags problems:
 
 Heuristics:
   - For long OK detection, we sample Recent Datapoints for the metric; if zero
-    datapoints over lookback, alarm might be stale.
-  - Uses GetMetricStatistics (simple) for a quick existence check only.
+    datapoints over lookback, alarm might be stale. Alarms already flagged for
+    another reason skip that check unless --thorough is given.
+  - Uses GetMetricData (batched, up to 500 metrics per call) for a quick existence check only.
 
 Safe: Read-only; no modifications.
 
 Output:
-  - Human table or JSON (--json) summarizing flagged alarms and reasons.
+  - Human table, JSON (--json) or line-delimited JSON (--ndjson) summarizing flagged alarms and reasons.
 
 Requirements:
   - boto3
-  - cloudwatch:DescribeAlarms, cloudwatch:GetMetricStatistics
+  - cloudwatch:DescribeAlarms, cloudwatch:GetMetricData
 
 Examples:
   python aws-cloudwatch-alarm-mute-checker.py --regions us-east-1 us-west-2 --json
@@ -37,9 +38,20 @@ Exit Codes:
 import argparse
 import boto3
 import datetime as dt
+import itertools
 import json
+import os
+import re
 import sys
-from typing import List, Dict, Any, Optional
+import time
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+# Larger pool for concurrent scans; adaptive retries back off client-side when throttled.
+BOTO_CFG = Config(max_pool_connections=50, retries={"mode": "adaptive", "max_attempts": 10},
+                  user_agent_extra="audit-scripts/1.0")
+REGION_CACHE_TTL = 24 * 3600
 
 
 def parse_args():
@@ -50,8 +62,11 @@ def parse_args():
     p.add_argument("--long-ok-days", type=int, default=21, help="Alarms OK this long but with no recent datapoints flagged")
     p.add_argument("--metric-lookback-hours", type=int, default=24, help="Window to check for recent datapoints for long OK alarms")
     p.add_argument("--json", action="store_true", help="JSON output")
-    p.add_argument("--name-filter", help="Substring filter on alarm name")
+    p.add_argument("--ndjson", action="store_true", help="One JSON object per flagged alarm, written as found")
+    p.add_argument("--name-filter", action="append", help="Substring filter on alarm name (repeat to match any)")
     p.add_argument("--namespace-filter", help="Substring filter on metric namespace")
+    p.add_argument("--workers", type=int, default=10, help="Regions scanned concurrently (default 10)")
+    p.add_argument("--thorough", action="store_true", help="Check recent datapoints even for alarms already flagged")
     return p.parse_args()
 
 
@@ -64,68 +79,103 @@ def session(profile: Optional[str]):
 def regions(sess, explicit):
     if explicit:
         return explicit
+    partition = sess.get_partition_for_region(sess.region_name or "us-east-1")
+    cache_path = os.path.expanduser(f"~/.cache/aws-audit/regions-{sess.profile_name}-{partition}.json")
+    try:
+        if time.time() - os.path.getmtime(cache_path) < REGION_CACHE_TTL:
+            with open(cache_path) as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
     try:
-        ec2 = sess.client("ec2")
-        r = ec2.describe_regions(AllRegions=False)
-        return sorted([x["RegionName"] for x in r["Regions"]])
+        ec2 = sess.client("ec2", config=BOTO_CFG)
+        resp = ec2.describe_regions(AllRegions=False)
+        found = sorted(r["RegionName"] for r in resp["Regions"])
     except Exception:
         return ["us-east-1"]
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(found, f)
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass
+    return found
 
 
 def list_alarms(cw):
-    out = []
-    token = None
-    while True:
-        kwargs = {"MaxRecords": 100}
-        if token:
-            kwargs["NextToken"] = token
-        resp = cw.describe_alarms(**kwargs)
-        out.extend(resp.get("MetricAlarms", []))
-        token = resp.get("NextToken")
-        if not token:
-            break
-    return out
-
-
-def has_recent_datapoint(cw, alarm, lookback_hours: int) -> bool:
-    metric = alarm.get("MetricName")
-    ns = alarm.get("Namespace")
-    dims = alarm.get("Dimensions", [])
-    if not metric or not ns:
-        return False
-    end = dt.datetime.utcnow()
-    start = end - dt.timedelta(hours=lookback_hours)
-    try:
-        resp = cw.get_metric_statistics(
-            Namespace=ns,
-            MetricName=metric,
-            Dimensions=dims,
-            StartTime=start,
-            EndTime=end,
-            Period=300,
-            Statistics=["SampleCount"],
-        )
-    except Exception:
-        return False
-    dp = resp.get("Datapoints", [])
-    return len(dp) > 0
+    paginator = cw.get_paginator("describe_alarms")
+    return [a for page in paginator.paginate(PaginationConfig={"PageSize": 100}) for a in page.get("MetricAlarms", [])]
+
+
+def recent_datapoints(cw, alarms, lookback_hours: int, now: dt.datetime) -> List[bool]:
+    """Return, per alarm, whether its metric has any datapoint in the lookback window."""
+    # Alarms on the same (namespace, metric, dimensions) share one query.
+    query_for: Dict[Tuple, int] = {}
+    slots = []
+    queries = []
+    for alarm in alarms:
+        metric = alarm.get("MetricName")
+        ns = alarm.get("Namespace")
+        if not metric or not ns:
+            slots.append(None)
+            continue
+        dims = alarm.get("Dimensions", [])
+        key = (ns, metric, tuple(sorted((d["Name"], d["Value"]) for d in dims)))
+        q = query_for.get(key)
+        if q is None:
+            q = query_for[key] = len(queries)
+            queries.append({
+                "Id": f"q{q}",
+                "MetricStat": {
+                    "Metric": {"Namespace": ns, "MetricName": metric, "Dimensions": dims},
+                    "Period": 300,
+                    "Stat": "SampleCount",
+                },
+                "ReturnData": True,
+            })
+        slots.append(q)
+    found = [False] * len(queries)
+    # Every alarm is measured against the same scan-wide "now".
+    end = now
+    start = now - dt.timedelta(hours=lookback_hours)
+    # GetMetricData takes up to 500 queries per request.
+    for i in range(0, len(queries), 500):
+        kwargs = {"MetricDataQueries": queries[i:i + 500], "StartTime": start, "EndTime": end}
+        try:
+            while True:
+                resp = cw.get_metric_data(**kwargs)
+                for res in resp.get("MetricDataResults", []):
+                    if res.get("Values"):
+                        found[int(res["Id"][1:])] = True
+                token = resp.get("NextToken")
+                if not token:
+                    break
+                kwargs["NextToken"] = token
+        except Exception:
+            continue
+    return [q is not None and found[q] for q in slots]
 
 
-def classify(alarm, now: dt.datetime, args, cw) -> List[str]:
+def classify(alarm, now: dt.datetime, stale_td: dt.timedelta, long_ok_td: dt.timedelta, thorough: bool) -> Tuple[List[str], bool]:
+    """Return the cheap reasons and whether the alarm still needs the long-OK datapoint check."""
     reasons = []
     state = alarm.get("StateValue")
     updated = alarm.get("StateUpdatedTimestamp")
     if isinstance(updated, str):
+        if updated.endswith("Z"):
+            updated = updated[:-1] + "+00:00"
         try:
-            updated = dt.datetime.fromisoformat(updated.replace("Z", "+00:00"))
-        except Exception:
+            updated = dt.datetime.fromisoformat(updated)
+        except ValueError:
             updated = None
-    if updated and isinstance(updated, dt.datetime) and updated.tzinfo:
+    if updated and updated.tzinfo:
         updated = updated.astimezone(dt.timezone.utc).replace(tzinfo=None)
 
     if state == "INSUFFICIENT_DATA" and updated:
-        if now - updated > dt.timedelta(days=args.stale_days):
-            reasons.append(f"INSUFFICIENT_DATA > {args.stale_days}d")
+        if now - updated > stale_td:
+            reasons.append(f"INSUFFICIENT_DATA > {stale_td.days}d")
 
     if not alarm.get("OKActions") and not alarm.get("AlarmActions"):
         reasons.append("No OK/ALARM actions configured")
@@ -133,11 +183,89 @@ def classify(alarm, now: dt.datetime, args, cw) -> List[str]:
     if alarm.get("ActionsEnabled") is False:
         reasons.append("Actions disabled")
 
-    if state == "OK" and updated and (now - updated > dt.timedelta(days=args.long_ok_days)):
-        if not has_recent_datapoint(cw, alarm, args.metric_lookback_hours):
-            reasons.append(f"OK > {args.long_ok_days}d & no recent datapoints")
+    # The datapoint check costs an API query; skip it once the alarm is already flagged.
+    if reasons and not thorough:
+        return reasons, False
+    long_ok = bool(state == "OK" and updated and (now - updated > long_ok_td))
+    return reasons, long_ok
+
+
+def scan_region(args, region: str, now: dt.datetime, stale_td: dt.timedelta, long_ok_td: dt.timedelta,
+                name_re: Optional[re.Pattern]) -> List[Dict[str, Any]]:
+    # Each worker thread gets its own session/client; boto3 sessions are not thread-safe.
+    cw = session(args.profile).client("cloudwatch", region_name=region, config=BOTO_CFG)
+    try:
+        alarms = list_alarms(cw)
+    except Exception as e:
+        print(f"WARN region {region} describe_alarms failed: {e}", file=sys.stderr)
+        return []
+    candidates = []
+    for a in alarms:
+        name = a.get("AlarmName")
+        metric_ns = a.get("Namespace") or a.get("Metrics", [{}])[0].get("Namespace")
+        if name_re and not name_re.search(name):
+            continue
+        if args.namespace_filter and metric_ns and args.namespace_filter not in metric_ns:
+            continue
+        reasons, long_ok = classify(a, now, stale_td, long_ok_td, args.thorough)
+        candidates.append((a, name, metric_ns, reasons, long_ok))
+
+    # Long-OK alarms are checked for recent data in batched GetMetricData calls.
+    long_ok_alarms = [c[0] for c in candidates if c[4]]
+    recent = iter(recent_datapoints(cw, long_ok_alarms, args.metric_lookback_hours, now))
 
-    return reasons
+    flagged = []
+    for a, name, metric_ns, reasons, long_ok in candidates:
+        if long_ok and not next(recent):
+            reasons.append(f"OK > {args.long_ok_days}d & no recent datapoints")
+        if reasons:
+            flagged.append({
+                "region": region,
+                "name": name,
+                "state": a.get("StateValue"),
+                "updated": a.get("StateUpdatedTimestamp"),
+                "metric": a.get("MetricName"),
+                "namespace": metric_ns,
+                "reasons": reasons,
+            })
+    return flagged
+
+
+def print_table(header: List[str], rows, sample: int = 1000) -> int:
+    """Stream rows as an aligned table; column widths come from the first `sample` rows."""
+    rows = iter(rows)
+    head = [[str(c) for c in header]]
+    head.extend([str(c) for c in row] for row in itertools.islice(rows, sample))
+    if len(head) == 1:
+        return 0
+    widths = [0] * len(header)
+    for row in head:
+        for j, c in enumerate(row):
+            if len(c) > widths[j]:
+                widths[j] = len(c)
+    fmt = "  ".join(f"{{:<{w}}}" for w in widths)
+    out = sys.stdout
+    out.write(fmt.format(*head[0]) + "\n" + "  ".join("-" * w for w in widths) + "\n")
+    out.write("".join(fmt.format(*row) + "\n" for row in head[1:]))
+    count = len(head) - 1
+    buf = []
+    for row in rows:
+        buf.append(fmt.format(*[str(c) for c in row]) + "\n")
+        count += 1
+        if len(buf) >= 256:
+            out.write("".join(buf))
+            buf.clear()
+    out.write("".join(buf))
+    return count
+
+
+def write_ndjson(records) -> int:
+    count = 0
+    for rec in records:
+        json.dump(rec, sys.stdout, default=str)
+        sys.stdout.write("\n")
+        count += 1
+    return count
 
 
 def main():
@@ -145,63 +273,42 @@ def main():
     sess = session(args.profile)
     regs = regions(sess, args.regions)
     now = dt.datetime.utcnow()
-    flagged = []
-
-    for region in regs:
-        cw = sess.client("cloudwatch", region_name=region)
-        try:
-            alarms = list_alarms(cw)
-        except Exception as e:
-            print(f"WARN region {region} describe_alarms failed: {e}", file=sys.stderr)
-            continue
-        for a in alarms:
-            name = a.get("AlarmName")
-            metric_ns = a.get("Namespace") or a.get("Metrics", [{}])[0].get("Namespace")
-            if args.name_filter and args.name_filter not in name:
-                continue
-            if args.namespace_filter and metric_ns and args.namespace_filter not in metric_ns:
-                continue
-            reasons = classify(a, now, args, cw)
-            if reasons:
-                flagged.append({
-                    "region": region,
-                    "name": name,
-                    "state": a.get("StateValue"),
-                    "updated": str(a.get("StateUpdatedTimestamp")),
-                    "metric": a.get("MetricName"),
-                    "namespace": metric_ns,
-                    "reasons": reasons,
-                })
-
-    if args.json:
-        print(json.dumps({
-            "regions": regs,
-            "stale_days": args.stale_days,
-            "long_ok_days": args.long_ok_days,
-            "metric_lookback_hours": args.metric_lookback_hours,
-            "flagged": flagged,
-        }, indent=2))
-        return 0
-
-    if not flagged:
+    # Thresholds are fixed for the whole scan; build them once.
+    stale_td = dt.timedelta(days=args.stale_days)
+    long_ok_td = dt.timedelta(days=args.long_ok_days)
+    # Several --name-filter values match if any of them appears in the name.
+    name_re = re.compile("|".join(map(re.escape, args.name_filter))) if args.name_filter else None
+
+    # Alarms stream out in region order, each region's as soon as its scan is done.
+    with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(regs)))) as pool:
+        flagged = (f for region_flagged in pool.map(lambda r: scan_region(args, r, now, stale_td, long_ok_td, name_re), regs)
+                   for f in region_flagged)
+
+        if args.ndjson:
+            write_ndjson(flagged)
+            return 0
+
+        if args.json:
+            json.dump({
+                "regions": regs,
+                "stale_days": args.stale_days,
+                "long_ok_days": args.long_ok_days,
+                "metric_lookback_hours": args.metric_lookback_hours,
+                "flagged": list(flagged),
+            }, sys.stdout, indent=2, default=str)
+            sys.stdout.write("\n")
+            return 0
+
+        header = ["Region", "Name", "State", "Updated", "Metric", "Namespace", "Reasons"]
+        shown = print_table(header, (
+            [f["region"], f["name"], f["state"], f["updated"], f.get("metric") or "-", f.get("namespace") or "-", "; ".join(f["reasons"])]
+            for f in flagged
+        ))
+
+    if not shown:
         print("No muted / stale alarms detected under current heuristics.")
         return 0
 
-    header = ["Region", "Name", "State", "Updated", "Metric", "Namespace", "Reasons"]
-    rows = [header]
-    for f in flagged:
-        rows.append([
-            f["region"], f["name"], f["state"], f["updated"], f.get("metric") or "-", f.get("namespace") or "-", "; ".join(f["reasons"])
-        ])
-    widths = [max(len(str(row[i])) for row in rows) for i in range(len(header))]
-    for i, row in enumerate(rows):
-        line = "  ".join(str(cell).ljust(widths[j]) for j, cell in enumerate(row))
-        if i == 0:
-            print(line)
-            print("  ".join("-" * w for w in widths))
-        else:
-            print(line)
-
     print("\nSuggestions: Review flagged alarms; add actions, fix metrics, or delete obsolete ones.")
     return 0
 
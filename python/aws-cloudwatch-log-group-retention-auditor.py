@@ -12,10 +12,10 @@ Classification:
 
 Features:
   - Multi-region scan
-  - Name filter substring (--name-filter)
+  - Name filter substring (--name-filter) repeatable
   - Tag filter (--required-tag Key=Value) repeatable
   - Optional --apply to set retention on MISSING or EXCESS groups to --target-retention-days
-  - JSON output option
+  - JSON output option (--json, or line-delimited with --ndjson)
   - Limit changes with --max-apply
 
 Permissions Required:
@@ -31,22 +31,36 @@ Exit Codes:
 """
 import argparse
 import boto3
+import functools
+import itertools
 import json
+import os
+import re
 import sys
+import time
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
+# Larger pool for concurrent scans; adaptive retries back off client-side when throttled.
+BOTO_CFG = Config(max_pool_connections=50, retries={"mode": "adaptive", "max_attempts": 10},
+                  user_agent_extra="audit-scripts/1.0")
+REGION_CACHE_TTL = 24 * 3600
+
 
 def parse_args():
     p = argparse.ArgumentParser(description="Audit / apply CloudWatch log group retention")
     p.add_argument("--regions", nargs="*", help="Regions to scan (default: all)")
     p.add_argument("--profile", help="AWS profile name")
-    p.add_argument("--name-filter", help="Substring filter on log group name")
+    p.add_argument("--name-filter", action="append", help="Substring filter on log group name (repeat to match any)")
     p.add_argument("--required-tag", action="append", help="Tag filter Key=Value (repeat)")
     p.add_argument("--max-retention-days", type=int, help="Max allowed retention; above classified EXCESS")
     p.add_argument("--target-retention-days", type=int, default=30, help="Retention to apply when fixing (default 30)")
     p.add_argument("--apply", action="store_true", help="Apply retention policy to flagged groups")
     p.add_argument("--max-apply", type=int, default=100, help="Max log groups to update")
     p.add_argument("--json", action="store_true", help="JSON output")
+    p.add_argument("--ndjson", action="store_true", help="One JSON object per flagged log group, written as found")
+    p.add_argument("--workers", type=int, default=10, help="Regions scanned concurrently (default 10)")
     return p.parse_args()
 
 
@@ -56,15 +70,37 @@ def session(profile: Optional[str]):
     return boto3.Session()
 
 
+@functools.lru_cache(maxsize=None)
+def get_client(sess, service: str, region: str):
+    return sess.client(service, region_name=region, config=BOTO_CFG)
+
+
 def discover_regions(sess, explicit):
     if explicit:
         return explicit
+    partition = sess.get_partition_for_region(sess.region_name or "us-east-1")
+    cache_path = os.path.expanduser(f"~/.cache/aws-audit/regions-{sess.profile_name}-{partition}.json")
+    try:
+        if time.time() - os.path.getmtime(cache_path) < REGION_CACHE_TTL:
+            with open(cache_path) as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
     try:
-        ec2 = sess.client("ec2")
+        ec2 = sess.client("ec2", config=BOTO_CFG)
         resp = ec2.describe_regions(AllRegions=False)
-        return sorted(r["RegionName"] for r in resp["Regions"])
+        found = sorted(r["RegionName"] for r in resp["Regions"])
     except Exception:
         return ["us-east-1"]
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(found, f)
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass
+    return found
 
 
 def parse_tag_filters(required_tags: Optional[List[str]]) -> Dict[str, str]:
@@ -97,18 +133,9 @@ def matches_tags(client, name: str, needed: Dict[str, str]):
 
 
 def list_log_groups(logs):
-    out = []
-    token = None
-    while True:
-        kwargs = {"limit": 50}
-        if token:
-            kwargs["nextToken"] = token
-        resp = logs.describe_log_groups(**kwargs)
-        out.extend(resp.get("logGroups", []))
-        token = resp.get("nextToken")
-        if not token:
-            break
-    return out
+    # 50 is the DescribeLogGroups maximum page size.
+    paginator = logs.get_paginator("describe_log_groups")
+    return [g for page in paginator.paginate(PaginationConfig={"PageSize": 50}) for g in page.get("logGroups", [])]
 
 
 def apply_retention(logs, name: str, days: int) -> Optional[str]:
@@ -119,86 +146,135 @@ def apply_retention(logs, name: str, days: int) -> Optional[str]:
         return str(e)
 
 
+def scan_region(args, logs, region: str, needed_tags: Dict[str, str], name_re: Optional[re.Pattern]) -> List[Dict[str, Any]]:
+    try:
+        groups = list_log_groups(logs)
+    except Exception as e:
+        print(f"WARN region {region} list log groups failed: {e}", file=sys.stderr)
+        return []
+    out = []
+    for g in groups:
+        name = g.get("logGroupName")
+        if name_re and not name_re.search(name):
+            continue
+        retention = g.get("retentionInDays")
+        status = None
+        reasons = []
+        if retention is None:
+            status = "MISSING"
+            reasons.append("No retention set (infinite)")
+        elif args.max_retention_days and retention > args.max_retention_days:
+            status = "EXCESS"
+            reasons.append(f"Retention {retention}d > max {args.max_retention_days}d")
+        if not status:
+            continue
+        out.append({
+            "region": region,
+            "name": name,
+            "current_retention": retention,
+            "status": status,
+            "reasons": reasons,
+            "apply_attempted": False,
+            "apply_error": None,
+            "new_retention": None,
+        })
+    # Tags are only fetched for groups that would otherwise be flagged. There is no
+    # bulk tag API for log groups, so the per-group calls are overlapped instead.
+    if needed_tags and out:
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            keep = list(pool.map(lambda rec: matches_tags(logs, rec["name"], needed_tags), out))
+        out = [rec for rec, ok in zip(out, keep) if ok]
+    return out
+
+
+def print_table(header: List[str], rows, sample: int = 1000) -> int:
+    """Stream rows as an aligned table; column widths come from the first `sample` rows."""
+    rows = iter(rows)
+    head = [[str(c) for c in header]]
+    head.extend([str(c) for c in row] for row in itertools.islice(rows, sample))
+    if len(head) == 1:
+        return 0
+    widths = [0] * len(header)
+    for row in head:
+        for j, c in enumerate(row):
+            if len(c) > widths[j]:
+                widths[j] = len(c)
+    fmt = "  ".join(f"{{:<{w}}}" for w in widths)
+    out = sys.stdout
+    out.write(fmt.format(*head[0]) + "\n" + "  ".join("-" * w for w in widths) + "\n")
+    out.write("".join(fmt.format(*row) + "\n" for row in head[1:]))
+    count = len(head) - 1
+    buf = []
+    for row in rows:
+        buf.append(fmt.format(*[str(c) for c in row]) + "\n")
+        count += 1
+        if len(buf) >= 256:
+            out.write("".join(buf))
+            buf.clear()
+    out.write("".join(buf))
+    return count
+
+
+def write_ndjson(records) -> int:
+    count = 0
+    for rec in records:
+        json.dump(rec, sys.stdout, default=str)
+        sys.stdout.write("\n")
+        count += 1
+    return count
+
+
 def main():
     args = parse_args()
     sess = session(args.profile)
     regs = discover_regions(sess, args.regions)
     needed_tags = parse_tag_filters(args.required_tag)
-
-    results = []
+    # Several --name-filter values match if any of them appears in the name.
+    name_re = re.compile("|".join(map(re.escape, args.name_filter))) if args.name_filter else None
     apply_count = 0
 
-    for region in regs:
-        logs = sess.client("logs", region_name=region)
-        try:
-            groups = list_log_groups(logs)
-        except Exception as e:
-            print(f"WARN region {region} list log groups failed: {e}", file=sys.stderr)
-            continue
-        for g in groups:
-            name = g.get("logGroupName")
-            if args.name_filter and args.name_filter not in name:
-                continue
-            if not matches_tags(logs, name, needed_tags):
-                continue
-            retention = g.get("retentionInDays")
-            status = None
-            reasons = []
-            if retention is None:
-                status = "MISSING"
-                reasons.append("No retention set (infinite)")
-            elif args.max_retention_days and retention > args.max_retention_days:
-                status = "EXCESS"
-                reasons.append(f"Retention {retention}d > max {args.max_retention_days}d")
-            if not status:
-                continue
-            rec = {
-                "region": region,
-                "name": name,
-                "current_retention": retention,
-                "status": status,
-                "reasons": reasons,
-                "apply_attempted": False,
-                "apply_error": None,
-                "new_retention": None,
-            }
-            if args.apply and apply_count < args.max_apply:
-                err = apply_retention(logs, name, args.target_retention_days)
-                rec["apply_attempted"] = True
-                rec["apply_error"] = err
-                rec["new_retention"] = None if err else args.target_retention_days
-                apply_count += 1
-            results.append(rec)
-
-    if args.json:
-        print(json.dumps({
-            "regions": regs,
-            "target_retention_days": args.target_retention_days,
-            "max_retention_days": args.max_retention_days,
-            "apply": args.apply,
-            "results": results,
-        }, indent=2))
-        return 0
+    for r in regs:
+        get_client(sess, "logs", r)
+
+    def flagged(pool):
+        nonlocal apply_count
+        for region_results in pool.map(lambda r: scan_region(args, get_client(sess, "logs", r), r, needed_tags, name_re), regs):
+            for rec in region_results:
+                # Changes are applied serially here, in this thread, so --max-apply holds across regions.
+                if args.apply and apply_count < args.max_apply:
+                    err = apply_retention(get_client(sess, "logs", rec["region"]), rec["name"], args.target_retention_days)
+                    rec["apply_attempted"] = True
+                    rec["apply_error"] = err
+                    rec["new_retention"] = None if err else args.target_retention_days
+                    apply_count += 1
+                yield rec
+
+    with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(regs)))) as pool:
+        if args.ndjson:
+            write_ndjson(flagged(pool))
+            return 0
 
-    if not results:
+        if args.json:
+            json.dump({
+                "regions": regs,
+                "target_retention_days": args.target_retention_days,
+                "max_retention_days": args.max_retention_days,
+                "apply": args.apply,
+                "results": list(flagged(pool)),
+            }, sys.stdout, indent=2, default=str)
+            sys.stdout.write("\n")
+            return 0
+
+        header = ["Region", "LogGroup", "Current", "Status", "Applied"]
+        shown = print_table(header, (
+            [r["region"], r["name"], r["current_retention"], r["status"],
+             ("Y" if r["apply_attempted"] and not r["apply_error"] else ("ERR" if r["apply_error"] else "N"))]
+            for r in flagged(pool)
+        ))
+
+    if not shown:
         print("No log groups with missing or excessive retention found.")
         return 0
-
-    header = ["Region", "LogGroup", "Current", "Status", "Applied"]
-    rows = [header]
-    for r in results:
-        rows.append([
-            r["region"], r["name"], r["current_retention"], r["status"],
-            ("Y" if r["apply_attempted"] and not r["apply_error"] else ("ERR" if r["apply_error"] else "N"))
-        ])
-    widths = [max(len(str(row[i])) for row in rows) for i in range(len(header))]
-    for i, row in enumerate(rows):
-        line = "  ".join(str(cell).ljust(widths[j]) for j, cell in enumerate(row))
-        if i == 0:
-            print(line)
-            print("  ".join("-" * w for w in widths))
-        else:
-            print(line)
     if not args.apply:
         print("\nDry-run only. Use --apply to set retention.")
     return 0
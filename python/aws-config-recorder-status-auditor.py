@@ -16,7 +16,7 @@ Features:
       * Delivery channel target (S3 bucket, SNS topic)
   - Optional remediation: --apply-start to start existing, stopped recorders
   - Safety cap with --max-apply
-  - JSON or human-readable output
+  - JSON, line-delimited JSON (--ndjson) or human-readable output
   - CI-friendly: --fail-on-findings returns exit code 2 when issues are found
 
 Permissions:
@@ -36,10 +36,21 @@ Exit Codes:
 import argparse
 import boto3
 import datetime as dt
+import functools
+import itertools
 import json
+import os
 import sys
+import time
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional
 
+# Larger pool for concurrent scans; adaptive retries back off client-side when throttled.
+BOTO_CFG = Config(max_pool_connections=50, retries={"mode": "adaptive", "max_attempts": 10},
+                  user_agent_extra="audit-scripts/1.0")
+REGION_CACHE_TTL = 24 * 3600
+
 
 def parse_args():
     p = argparse.ArgumentParser(description="Audit AWS Config recorder status across regions")
@@ -49,6 +60,8 @@ def parse_args():
     p.add_argument("--max-apply", type=int, default=50, help="Max recorders to start (default: 50)")
     p.add_argument("--fail-on-findings", action="store_true", help="Exit 2 if any misconfigurations are found")
     p.add_argument("--json", action="store_true", help="JSON output")
+    p.add_argument("--ndjson", action="store_true", help="One JSON object per region with findings, written as found")
+    p.add_argument("--workers", type=int, default=10, help="Regions scanned concurrently (default 10)")
     return p.parse_args()
 
 
@@ -58,15 +71,37 @@ def session(profile: Optional[str]):
     return boto3.Session()
 
 
+@functools.lru_cache(maxsize=None)
+def get_client(sess, service: str, region: str):
+    return sess.client(service, region_name=region, config=BOTO_CFG)
+
+
 def discover_regions(sess, explicit):
     if explicit:
         return explicit
+    partition = sess.get_partition_for_region(sess.region_name or "us-east-1")
+    cache_path = os.path.expanduser(f"~/.cache/aws-audit/regions-{sess.profile_name}-{partition}.json")
+    try:
+        if time.time() - os.path.getmtime(cache_path) < REGION_CACHE_TTL:
+            with open(cache_path) as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
     try:
-        ec2 = sess.client("ec2")
+        ec2 = sess.client("ec2", config=BOTO_CFG)
         resp = ec2.describe_regions(AllRegions=False)
-        return sorted(r["RegionName"] for r in resp["Regions"])
+        found = sorted(r["RegionName"] for r in resp["Regions"])
     except Exception:
         return ["us-east-1"]
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(found, f)
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass
+    return found
 
 
 def list_recorders(cfg):
@@ -101,104 +136,140 @@ def start_recorder(cfg, name: str) -> Optional[str]:
         return str(e)
 
 
+def scan_region(cfg, region: str) -> Dict[str, Any]:
+    recs = list_recorders(cfg)
+    recs_status = list_recorders_status(cfg)
+    chans = list_delivery_channels(cfg)
+
+    has_recorder = len(recs) > 0
+    has_channel = len(chans) > 0
+
+    # One pass over the status list: which recorders are recording
+    recording = {s.get("name") for s in recs_status if s.get("recording")}
+    any_recording = bool(recording)
+
+    # Delivery channel targets (only report the first for brevity)
+    dc = chans[0] if chans else {}
+    s3_bucket = (dc.get("s3BucketName") or None) if dc else None
+    sns_topic = (dc.get("snsTopicARN") or None) if dc else None
+
+    # Recorder names and those stopped
+    rec_names = [r.get("name") for r in recs]
+    stopped_names = [n for n in rec_names if n not in recording]
+
+    return {
+        "region": region,
+        "has_recorder": has_recorder,
+        "has_delivery_channel": has_channel,
+        "recorder_names": rec_names,
+        "any_recording": any_recording,
+        "stopped_recorders": stopped_names,
+        "s3_bucket": s3_bucket,
+        "sns_topic": sns_topic,
+        "apply_attempted": False,
+        "apply_error": None,
+    }
+
+
+def print_table(header: List[str], rows, sample: int = 1000) -> int:
+    """Stream rows as an aligned table; column widths come from the first `sample` rows."""
+    rows = iter(rows)
+    head = [[str(c) for c in header]]
+    head.extend([str(c) for c in row] for row in itertools.islice(rows, sample))
+    if len(head) == 1:
+        return 0
+    widths = [0] * len(header)
+    for row in head:
+        for j, c in enumerate(row):
+            if len(c) > widths[j]:
+                widths[j] = len(c)
+    fmt = "  ".join(f"{{:<{w}}}" for w in widths)
+    out = sys.stdout
+    out.write(fmt.format(*head[0]) + "\n" + "  ".join("-" * w for w in widths) + "\n")
+    out.write("".join(fmt.format(*row) + "\n" for row in head[1:]))
+    count = len(head) - 1
+    buf = []
+    for row in rows:
+        buf.append(fmt.format(*[str(c) for c in row]) + "\n")
+        count += 1
+        if len(buf) >= 256:
+            out.write("".join(buf))
+            buf.clear()
+    out.write("".join(buf))
+    return count
+
+
+def write_ndjson(records) -> int:
+    count = 0
+    for rec in records:
+        json.dump(rec, sys.stdout, default=str)
+        sys.stdout.write("\n")
+        count += 1
+    return count
+
+
 def main():
     args = parse_args()
     sess = session(args.profile)
     regions = discover_regions(sess, args.regions)
-
-    results = []
     started = 0
 
-    for region in regions:
-        cfg = sess.client("config", region_name=region)
-        recs = list_recorders(cfg)
-        recs_status = list_recorders_status(cfg)
-        chans = list_delivery_channels(cfg)
-
-        has_recorder = len(recs) > 0
-        has_channel = len(chans) > 0
-
-        # Map status by name for clarity
-        status_by_name: Dict[str, Dict[str, Any]] = {s.get("name"): s for s in recs_status}
-
-        # Determine recording status summary
-        any_recording = any(bool(s.get("recording")) for s in recs_status)
-        errors = [s.get("lastErrorCode") or s.get("lastStartStatus") for s in recs_status if (s.get("lastErrorCode") or s.get("lastStartStatus") == "Failed")]
-
-        # Delivery channel targets (only report the first for brevity)
-        dc = chans[0] if chans else {}
-        s3_bucket = (dc.get("s3BucketName") or None) if dc else None
-        sns_topic = (dc.get("snsTopicARN") or None) if dc else None
-
-        # Recorder names and those stopped
-        rec_names = [r.get("name") for r in recs]
-        stopped_names = [n for n in rec_names if not (status_by_name.get(n) or {}).get("recording")]
-
-        rec = {
-            "region": region,
-            "has_recorder": has_recorder,
-            "has_delivery_channel": has_channel,
-            "recorder_names": rec_names,
-            "any_recording": any_recording,
-            "stopped_recorders": stopped_names,
-            "s3_bucket": s3_bucket,
-            "sns_topic": sns_topic,
-            "apply_attempted": False,
-            "apply_error": None,
-        }
-
-        # Findings: missing components or not recording
-        finding = (not has_recorder) or (not has_channel) or (not any_recording)
-
-        # Attempt remediation if requested
-        if args.apply_start and finding and has_recorder and stopped_names and started < args.max_apply:
-            # Start the first stopped recorder (start for others can be run in subsequent runs)
-            to_start = stopped_names[0]
-            err = start_recorder(cfg, to_start)
-            rec["apply_attempted"] = True
-            rec["apply_error"] = err
-            if err is None:
-                started += 1
-
-        if finding:
-            results.append(rec)
-
-    payload = {
-        "regions": regions,
-        "apply_start": args.apply_start,
-        "started": started,
-        "results": results,
-    }
-
-    if args.json:
-        print(json.dumps(payload, indent=2))
-        return 0 if (results or not args.fail_on_findings) else 2
-
-    if not results:
+    for r in regions:
+        get_client(sess, "config", r)
+
+    def findings(pool):
+        nonlocal started
+        for rec in pool.map(lambda r: scan_region(get_client(sess, "config", r), r), regions):
+            # Findings: missing components or not recording
+            if rec["has_recorder"] and rec["has_delivery_channel"] and rec["any_recording"]:
+                continue
+
+            # Remediation runs serially here, in this thread, so --max-apply holds across regions.
+            if args.apply_start and rec["has_recorder"] and rec["stopped_recorders"] and started < args.max_apply:
+                # Start the first stopped recorder (start for others can be run in subsequent runs)
+                to_start = rec["stopped_recorders"][0]
+                err = start_recorder(get_client(sess, "config", rec["region"]), to_start)
+                rec["apply_attempted"] = True
+                rec["apply_error"] = err
+                if err is None:
+                    started += 1
+            yield rec
+
+    with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(regions)))) as pool:
+        if args.ndjson:
+            found = write_ndjson(findings(pool))
+            return 2 if (args.fail_on_findings and found) else 0
+
+        if args.json:
+            results = list(findings(pool))
+            payload = {
+                "regions": regions,
+                "apply_start": args.apply_start,
+                "started": started,
+                "results": results,
+            }
+            json.dump(payload, sys.stdout, indent=2, default=str)
+            sys.stdout.write("\n")
+            return 2 if (args.fail_on_findings and results) else 0
+
+        header = ["Region", "HasRec", "HasChan", "AnyRec", "Stopped", "S3Bucket", "Applied"]
+        shown = print_table(header, (
+            [
+                r["region"], "Y" if r["has_recorder"] else "N", "Y" if r["has_delivery_channel"] else "N",
+                "Y" if r["any_recording"] else "N", ",".join(r["stopped_recorders"]) or "-",
+                r.get("s3_bucket") or "-",
+                ("Y" if r["apply_attempted"] and not r["apply_error"] else ("ERR" if r["apply_error"] else "N")),
+            ]
+            for r in findings(pool)
+        ))
+
+    if not shown:
         print("AWS Config appears healthy across scanned regions (recorder + delivery channel + recording).")
         return 0
-
-    header = ["Region", "HasRec", "HasChan", "AnyRec", "Stopped", "S3Bucket", "Applied"]
-    rows = [header]
-    for r in results:
-        rows.append([
-            r["region"], "Y" if r["has_recorder"] else "N", "Y" if r["has_delivery_channel"] else "N",
-            "Y" if r["any_recording"] else "N", ",".join(r["stopped_recorders"]) or "-",
-            r.get("s3_bucket") or "-",
-            ("Y" if r["apply_attempted"] and not r["apply_error"] else ("ERR" if r["apply_error"] else "N")),
-        ])
-    widths = [max(len(str(row[i])) for row in rows) for i in range(len(header))]
-    for i, row in enumerate(rows):
-        line = '  '.join(str(cell).ljust(widths[j]) for j, cell in enumerate(row))
-        if i == 0:
-            print(line)
-            print('  '.join('-' * w for w in widths))
-        else:
-            print(line)
     if not args.apply_start:
         print("\nDry-run. Use --apply-start to start existing, stopped recorders.")
 
-    if args.fail_on_findings and results:
+    if args.fail_on_findings and shown:
         return 2
     return 0
 
@@ -15,9 +15,10 @@ Features:
   - Actions: --apply-tag to mark candidates for review (dry-run by default)
   - Safety cap: --max-apply
   - JSON or human-readable output
+  - DescribeTable results cached on disk for an hour (--no-cache to bypass); flagged tables are re-checked live
 
 Permissions:
-  - dynamodb:ListTables, dynamodb:DescribeTable, cloudwatch:GetMetricStatistics, dynamodb:ListTagsOfResource, dynamodb:TagResource
+  - dynamodb:ListTables, dynamodb:DescribeTable, cloudwatch:GetMetricData, dynamodb:ListTagsOfResource, dynamodb:TagResource
 
 Examples:
   python aws-dynamodb-usage-auditor.py --window-days 14 --min-util-percent 10 --json
@@ -30,12 +31,31 @@ Exit Codes:
 import argparse
 import boto3
 import datetime as dt
+import functools
+import itertools
 import json
+import math
+import os
 import sys
+import time
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
 
 CW_NS = "AWS/DynamoDB"
+CONSUMED_METRICS = ("ConsumedReadCapacityUnits", "ConsumedWriteCapacityUnits")
+REGION_CACHE_TTL = 24 * 3600
+DESCRIBE_CACHE_TTL = 3600
+# Datapoints per metric series; beyond this GetMetricData splits a batch across NextToken pages.
+MAX_DATAPOINTS = 1440
+# Shared by all clients so concurrent regions don't exhaust the pool; adaptive retries absorb throttling.
+BOTO_CFG = Config(max_pool_connections=64, retries={"mode": "adaptive", "max_attempts": 10})
 
 
 def parse_args():
@@ -53,6 +73,8 @@ def parse_args():
     p.add_argument("--tag-value", default="dynamo-unused-candidate", help="Tag value (default: dynamo-unused-candidate)")
     p.add_argument("--max-apply", type=int, default=50, help="Max tables to tag (default: 50)")
     p.add_argument("--json", action="store_true", help="JSON output")
+    p.add_argument("--workers", type=int, default=16, help="Regions audited concurrently (default 16)")
+    p.add_argument("--no-cache", action="store_true", help="Always call DescribeTable instead of using the 1h on-disk cache")
     return p.parse_args()
 
 
@@ -62,15 +84,40 @@ def session(profile: Optional[str]):
     return boto3.Session()
 
 
+@functools.lru_cache(maxsize=None)
+def get_client(sess, service: str, region: str):
+    return sess.client(service, region_name=region, config=BOTO_CFG)
+
+
 def discover_regions(sess, explicit):
     if explicit:
         return explicit
+    use_cache = os.environ.get("AUDITOR_NO_REGION_CACHE") != "1"
+    partition = sess.get_partition_for_region(sess.region_name or "us-east-1")
+    cache_path = os.path.expanduser(f"~/.cache/aws-audit/regions-{sess.profile_name}-{partition}.json")
+    if use_cache:
+        try:
+            if time.time() - os.path.getmtime(cache_path) < REGION_CACHE_TTL:
+                with open(cache_path) as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
     try:
-        ec2 = sess.client("ec2")
+        ec2 = sess.client("ec2", config=BOTO_CFG)
         resp = ec2.describe_regions(AllRegions=False)
-        return sorted(r["RegionName"] for r in resp["Regions"])
+        found = sorted(r["RegionName"] for r in resp["Regions"])
     except Exception:
         return ["us-east-1"]
+    if use_cache:
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(found, f)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass
+    return found
 
 
 def parse_tag_filters(required: Optional[List[str]]):
@@ -85,40 +132,50 @@ def parse_tag_filters(required: Optional[List[str]]):
     return out
 
 
-def cw_sum_metric(cw, table_name: str, metric_name: str, start: dt.datetime, end: dt.datetime, period: int) -> float:
-    try:
-        resp = cw.get_metric_statistics(
-            Namespace=CW_NS,
-            MetricName=metric_name,
-            Dimensions=[{"Name": "TableName", "Value": table_name}],
-            StartTime=start,
-            EndTime=end,
-            Period=period,
-            Statistics=["Sum"],
-        )
-        return float(sum(p.get("Sum", 0.0) for p in resp.get("Datapoints", [])))
-    except Exception:
-        return 0.0
-
-
-def cw_avg_metric(cw, table_name: str, metric_name: str, start: dt.datetime, end: dt.datetime, period: int) -> float:
-    try:
-        resp = cw.get_metric_statistics(
-            Namespace=CW_NS,
-            MetricName=metric_name,
-            Dimensions=[{"Name": "TableName", "Value": table_name}],
-            StartTime=start,
-            EndTime=end,
-            Period=period,
-            Statistics=["Average"],
-        )
-        pts = resp.get("Datapoints", [])
-        if not pts:
-            return 0.0
-        vals = [float(p.get("Average", 0.0)) for p in pts]
-        return sum(vals) / len(vals)
-    except Exception:
-        return 0.0
+def consumed_capacity(cw, tables: List[str], start: dt.datetime, end: dt.datetime, period: int) -> Dict[str, Dict[str, float]]:
+    """Sum ConsumedRead/WriteCapacityUnits over the window for each table via batched GetMetricData.
+
+    Tables whose metrics could not be fetched are left out of the result rather than reported as zero.
+    """
+    totals = {t: {m: 0.0 for m in CONSUMED_METRICS} for t in tables}
+    queries = []
+    keys = {}
+    for i, t in enumerate(tables):
+        for j, metric in enumerate(CONSUMED_METRICS):
+            qid = f"m{i}_{j}"
+            keys[qid] = (t, metric)
+            queries.append({
+                "Id": qid,
+                "MetricStat": {
+                    "Metric": {"Namespace": CW_NS, "MetricName": metric, "Dimensions": [{"Name": "TableName", "Value": t}]},
+                    "Period": period,
+                    "Stat": "Sum",
+                },
+                "ReturnData": True,
+            })
+    missing = set()
+    # GetMetricData takes up to 500 queries per request.
+    for i in range(0, len(queries), 500):
+        batch = queries[i:i + 500]
+        kwargs = {"MetricDataQueries": batch, "StartTime": start, "EndTime": end, "ScanBy": "TimestampAscending"}
+        try:
+            while True:
+                resp = cw.get_metric_data(**kwargs)
+                for res in resp.get("MetricDataResults", []):
+                    t, metric = keys[res["Id"]]
+                    if res.get("StatusCode") in ("InternalError", "Forbidden"):
+                        missing.add(t)
+                    totals[t][metric] += float(sum(res.get("Values", [])))
+                token = resp.get("NextToken")
+                if not token:
+                    break
+                kwargs["NextToken"] = token
+        except Exception:
+            # A failure mid-pagination leaves partial sums; drop the whole batch.
+            missing.update(keys[q["Id"]][0] for q in batch)
+    for t in missing:
+        del totals[t]
+    return totals
 
 
 def tag_table(dynamodb, table_arn: str, key: str, value: str) -> Optional[str]:
@@ -137,118 +194,237 @@ def list_tags(dynamodb, table_arn: str) -> Dict[str, str]:
         return {}
 
 
+def cached_describe(dd, t: str, cache_dir: Optional[str], refresh: bool = False) -> Dict[str, Any]:
+    """DescribeTable, keeping the fields the audit reads on disk for DESCRIBE_CACHE_TTL seconds.
+
+    Entries read from the cache carry "cached": True; refresh=True skips the read but still rewrites the entry.
+    """
+    cache_path = os.path.join(cache_dir, f"{t}.json") if cache_dir else None
+    if cache_path and not refresh:
+        try:
+            if time.time() - os.path.getmtime(cache_path) < DESCRIBE_CACHE_TTL:
+                with open(cache_path) as f:
+                    return dict(json.load(f), cached=True)
+        except (OSError, ValueError):
+            pass
+    table = dd.describe_table(TableName=t).get("Table", {})
+    desc = {k: table[k] for k in ("TableId", "TableArn", "BillingModeSummary", "ProvisionedThroughput") if k in table}
+    if cache_path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(desc, f, default=str)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass
+    return desc
+
+
+def describe_candidate(dd, t: str, needed_tags: Dict[str, str], cache_dir: Optional[str], refresh: bool = False):
+    """Return (table, arn, billing, read_units, write_units, table_id, cached), or None if skipped."""
+    try:
+        desc = cached_describe(dd, t, cache_dir, refresh)
+        table_arn = desc.get("TableArn")
+        billing = desc.get("BillingModeSummary", {}).get("BillingMode")
+        provisioned = desc.get("ProvisionedThroughput", {})
+        read_units = provisioned.get("ReadCapacityUnits") or 0
+        write_units = provisioned.get("WriteCapacityUnits") or 0
+    except Exception:
+        return None
+
+    # Tags only feed the --required-tag filter, so skip the lookup when there is none.
+    if needed_tags:
+        tags = list_tags(dd, table_arn) if table_arn else {}
+        for k, v in needed_tags.items():
+            if tags.get(k) != v:
+                return None
+    return t, table_arn, billing, read_units, write_units, desc.get("TableId"), desc.get("cached", False)
+
+
+def audit_region(region: str, dd, cw, args, start: dt.datetime, end: dt.datetime, needed_tags: Dict[str, str],
+                 cache_dir: Optional[str]) -> List[Dict[str, Any]]:
+    try:
+        # ListTables returns at most 100 names per call.
+        paginator = dd.get_paginator("list_tables")
+        tables = [t for page in paginator.paginate(PaginationConfig={"PageSize": 100}) for t in page.get("TableNames", [])]
+    except Exception as e:
+        print(f"WARN region {region} list tables failed: {e}", file=sys.stderr)
+        return []
+
+    names = [t for t in tables if not args.name_filter or args.name_filter in t]
+    region_cache = os.path.join(cache_dir, region) if cache_dir else None
+    # DescribeTable/ListTagsOfResource are independent per table; overlap them on a shared client.
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        candidates = [c for c in pool.map(lambda t: describe_candidate(dd, t, needed_tags, region_cache), names) if c]
+
+    # CloudWatch metrics for all remaining tables in the region, in as few requests as possible
+    consumed = consumed_capacity(cw, [c[0] for c in candidates], start, end, args.period)
+
+    # Number of metric periods in the window; the same for every table
+    periods = max(1, int((end - start).total_seconds() // args.period))
+
+    skipped = [c[0] for c in candidates if c[0] not in consumed]
+    if skipped:
+        print(f"WARN region {region} metrics unavailable for {len(skipped)} table(s), not audited: {', '.join(skipped)}",
+              file=sys.stderr)
+
+    def evaluate(t, table_arn, billing, read_units, write_units) -> Dict[str, Any]:
+        consumed_read = consumed[t]["ConsumedReadCapacityUnits"]
+        consumed_write = consumed[t]["ConsumedWriteCapacityUnits"]
+
+        # For PROVISIONED, compute average utilization percent over window
+        read_util_pct = None
+        write_util_pct = None
+        if billing == "PROVISIONED":
+            # average provisioned per period: provisioned_units * (window_seconds / period) aggregated
+            avg_read_provisioned = (read_units * args.period)  # units per period
+            avg_write_provisioned = (write_units * args.period)
+            # consumed_read is sum over window; convert to per-period average. Idle periods publish
+            # no datapoints, so this divides by every period in the window, not the datapoint count.
+            avg_consumed_read_per_period = consumed_read / periods
+            avg_consumed_write_per_period = consumed_write / periods
+            # utilization percent
+            read_util_pct = (avg_consumed_read_per_period / avg_read_provisioned * 100.0) if avg_read_provisioned > 0 else 0.0
+            write_util_pct = (avg_consumed_write_per_period / avg_write_provisioned * 100.0) if avg_write_provisioned > 0 else 0.0
+
+        # PAY_PER_REQUEST (on-demand): flag if total ops over window is below threshold
+        pay_ops = None
+        pay_flag = False
+        if billing == "PAY_PER_REQUEST":
+            total_ops = int(consumed_read + consumed_write)
+            pay_ops = total_ops
+            if total_ops < args.paylow_threshold:
+                pay_flag = True
+
+        flagged = False
+        reasons = []
+        if billing == "PROVISIONED":
+            if (read_util_pct is not None and read_util_pct < args.min_util_percent) or (write_util_pct is not None and write_util_pct < args.min_util_percent):
+                flagged = True
+                reasons.append(f"low-util r:{read_util_pct:.1f}% w:{write_util_pct:.1f}%")
+        elif billing == "PAY_PER_REQUEST":
+            if pay_flag:
+                flagged = True
+                reasons.append(f"low-ops total:{pay_ops}")
+
+        rec = {
+            "region": region,
+            "table": t,
+            "table_arn": table_arn,
+            "billing_mode": billing,
+            "read_units": read_units,
+            "write_units": write_units,
+            "consumed_read": consumed_read,
+            "consumed_write": consumed_write,
+            "read_util_pct": read_util_pct,
+            "write_util_pct": write_util_pct,
+            "pay_ops": pay_ops,
+            "flagged": flagged,
+            "reasons": reasons,
+            "tag_attempted": False,
+            "tag_error": None,
+        }
+        return rec
+
+    out = []
+    for t, table_arn, billing, read_units, write_units, table_id, cached in candidates:
+        if t not in consumed:
+            continue
+        rec = evaluate(t, table_arn, billing, read_units, write_units)
+        if rec["flagged"] and cached:
+            # A flag can lead to tagging, so re-check a cached description against the live table: a table
+            # recreated under the same name within the cache TTL has a new TableId and possibly new settings.
+            fresh = describe_candidate(dd, t, needed_tags, region_cache, refresh=True)
+            if fresh is None:
+                continue
+            if fresh[5] != table_id or fresh[1:5] != (table_arn, billing, read_units, write_units):
+                rec = evaluate(*fresh[:5])
+        if rec["flagged"]:
+            out.append(rec)
+    return out
+
+
+def print_table(header: List[str], rows, sample: int = 1000) -> int:
+    """Stream rows as an aligned table; column widths come from the first `sample` rows."""
+    rows = iter(rows)
+    head = [[str(c) for c in header]]
+    head.extend([str(c) for c in row] for row in itertools.islice(rows, sample))
+    if len(head) == 1:
+        return 0
+    widths = [0] * len(header)
+    for row in head:
+        for j, c in enumerate(row):
+            if len(c) > widths[j]:
+                widths[j] = len(c)
+    fmt = "  ".join(f"{{:<{w}}}" for w in widths)
+    out = sys.stdout
+    out.write(fmt.format(*head[0]) + "\n" + "  ".join("-" * w for w in widths) + "\n")
+    out.write("".join(fmt.format(*row) + "\n" for row in head[1:]))
+    count = len(head) - 1
+    buf = []
+    for row in rows:
+        buf.append(fmt.format(*[str(c) for c in row]) + "\n")
+        count += 1
+        if len(buf) >= 256:
+            out.write("".join(buf))
+            buf.clear()
+    out.write("".join(buf))
+    return count
+
+
+def write_json(payload) -> None:
+    if orjson is not None:
+        # Datetimes are passed through to default=str so output matches the stdlib path.
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(payload, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME))
+        sys.stdout.buffer.write(b"\n")
+        return
+    json.dump(payload, sys.stdout, indent=2, default=str)
+    sys.stdout.write("\n")
+
+
 def main():
     args = parse_args()
     sess = session(args.profile)
     regions = discover_regions(sess, args.regions)
     needed_tags = parse_tag_filters(args.required_tag)
 
-    end = dt.datetime.utcnow()
+    end = dt.datetime.now(dt.timezone.utc)
     start = end - dt.timedelta(days=args.window_days)
+    # Long windows at a fine period mean many datapoints per table; coarsen the period (in whole
+    # minutes, as CloudWatch requires) so each series stays within MAX_DATAPOINTS.
+    min_period = math.ceil((end - start).total_seconds() / MAX_DATAPOINTS / 60) * 60
+    if args.period < min_period:
+        print(f"WARN --period {args.period}s raised to {min_period}s to keep {args.window_days}d under {MAX_DATAPOINTS} datapoints per metric",
+              file=sys.stderr)
+        args.period = min_period
+    # Billing mode and provisioned throughput rarely change between runs; see cached_describe().
+    cache_dir = None if args.no_cache else os.path.expanduser(f"~/.cache/aws-audit/describe-{sess.profile_name}")
+
+    for r in regions:
+        get_client(sess, "dynamodb", r)
+        get_client(sess, "cloudwatch", r)
 
     results = []
-    applied = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(regions)))) as pool:
+        for region_results in pool.map(lambda r: audit_region(r, get_client(sess, "dynamodb", r), get_client(sess, "cloudwatch", r), args, start, end, needed_tags, cache_dir), regions):
+            results.extend(region_results)
+    results.sort(key=lambda r: (r["region"], r["table"]))
 
-    for region in regions:
-        dd = sess.client("dynamodb", region_name=region)
-        cw = sess.client("cloudwatch", region_name=region)
-        try:
-            tables_resp = dd.list_tables()
-            tables = tables_resp.get("TableNames", [])
-        except Exception as e:
-            print(f"WARN region {region} list tables failed: {e}", file=sys.stderr)
-            continue
-
-        for t in tables:
-            if args.name_filter and args.name_filter not in t:
-                continue
-            try:
-                desc = dd.describe_table(TableName=t)
-                table_arn = desc.get("Table", {}).get("TableArn")
-                billing = desc.get("Table", {}).get("BillingModeSummary", {}).get("BillingMode")
-                provisioned = desc.get("Table", {}).get("ProvisionedThroughput", {})
-                read_units = provisioned.get("ReadCapacityUnits") or 0
-                write_units = provisioned.get("WriteCapacityUnits") or 0
-            except Exception:
+    # Tagging runs afterwards, in a fixed order, so --max-apply holds across regions.
+    applied = 0
+    if args.apply_tag:
+        for rec in results:
+            if applied >= args.max_apply:
+                break
+            if not rec["table_arn"]:
                 continue
-
-            tags = list_tags(dd, table_arn) if table_arn else {}
-            if needed_tags:
-                ok = True
-                for k, v in needed_tags.items():
-                    if tags.get(k) != v:
-                        ok = False
-                        break
-                if not ok:
-                    continue
-
-            # CloudWatch metrics
-            consumed_read = cw_sum_metric(cw, t, "ConsumedReadCapacityUnits", start, end, args.period)
-            consumed_write = cw_sum_metric(cw, t, "ConsumedWriteCapacityUnits", start, end, args.period)
-
-            # For PROVISIONED, compute average utilization percent over window
-            read_util_pct = None
-            write_util_pct = None
-            if billing == "PROVISIONED":
-                # average provisioned per period: provisioned_units * (window_seconds / period) aggregated
-                window_seconds = (end - start).total_seconds()
-                periods = max(1, int(window_seconds // args.period))
-                avg_read_provisioned = (read_units * args.period)  # units per period
-                avg_write_provisioned = (write_units * args.period)
-                # consumed_read is sum over window; convert to per-period average
-                avg_consumed_read_per_period = consumed_read / max(1, periods)
-                avg_consumed_write_per_period = consumed_write / max(1, periods)
-                # utilization percent
-                read_util_pct = (avg_consumed_read_per_period / avg_read_provisioned * 100.0) if avg_read_provisioned > 0 else 0.0
-                write_util_pct = (avg_consumed_write_per_period / avg_write_provisioned * 100.0) if avg_write_provisioned > 0 else 0.0
-
-            # PAY_PER_REQUEST (on-demand): flag if total ops over window is below threshold
-            pay_ops = None
-            pay_flag = False
-            if billing == "PAY_PER_REQUEST":
-                total_ops = int(consumed_read + consumed_write)
-                pay_ops = total_ops
-                if total_ops < args.paylow_threshold:
-                    pay_flag = True
-
-            flagged = False
-            reasons = []
-            if billing == "PROVISIONED":
-                if (read_util_pct is not None and read_util_pct < args.min_util_percent) or (write_util_pct is not None and write_util_pct < args.min_util_percent):
-                    flagged = True
-                    reasons.append(f"low-util r:{read_util_pct:.1f}% w:{write_util_pct:.1f}%")
-            elif billing == "PAY_PER_REQUEST":
-                if pay_flag:
-                    flagged = True
-                    reasons.append(f"low-ops total:{pay_ops}")
-
-            rec = {
-                "region": region,
-                "table": t,
-                "table_arn": table_arn,
-                "billing_mode": billing,
-                "read_units": read_units,
-                "write_units": write_units,
-                "consumed_read": consumed_read,
-                "consumed_write": consumed_write,
-                "read_util_pct": read_util_pct,
-                "write_util_pct": write_util_pct,
-                "pay_ops": pay_ops,
-                "flagged": flagged,
-                "reasons": reasons,
-                "tag_attempted": False,
-                "tag_error": None,
-            }
-
-            if flagged and args.apply_tag and applied < args.max_apply and table_arn:
-                err = tag_table(dd, table_arn, args.tag_key, args.tag_value)
-                rec["tag_attempted"] = True
-                rec["tag_error"] = err
-                if err is None:
-                    applied += 1
-
-            if flagged:
-                results.append(rec)
+            err = tag_table(get_client(sess, "dynamodb", rec["region"]), rec["table_arn"], args.tag_key, args.tag_value)
+            rec["tag_attempted"] = True
+            rec["tag_error"] = err
+            if err is None:
+                applied += 1
 
     payload = {
         "regions": regions,
@@ -261,7 +437,7 @@ def main():
     }
 
     if args.json:
-        print(json.dumps(payload, indent=2))
+        write_json(payload)
         return 0
 
     if not results:
@@ -269,23 +445,16 @@ def main():
         return 0
 
     header = ["Region", "Table", "Billing", "ReadUtil%", "WriteUtil%", "Ops", "Tagged"]
-    rows = [header]
-    for r in results:
-        rows.append([
+    print_table(header, (
+        [
             r["region"], r["table"], r["billing_mode"] or "-",
             ("-" if r.get("read_util_pct") is None else f"{r['read_util_pct']:.1f}%"),
             ("-" if r.get("write_util_pct") is None else f"{r['write_util_pct']:.1f}%"),
             (r.get("pay_ops") if r.get("pay_ops") is not None else "-"),
             ("Y" if r["tag_attempted"] and not r["tag_error"] else ("ERR" if r["tag_error"] else "N")),
-        ])
-    widths = [max(len(str(row[i])) for row in rows) for i in range(len(header))]
-    for i, row in enumerate(rows):
-        line = '  '.join(str(cell).ljust(widths[j]) for j, cell in enumerate(row))
-        if i == 0:
-            print(line)
-            print('  '.join('-' * w for w in widths))
-        else:
-            print(line)
+        ]
+        for r in results
+    ))
 
     if not args.apply_tag:
         print("\nDry-run. Use --apply-tag to mark candidates for review.")
@@ -7,7 +7,7 @@ Purpose:
   consistently reaching performance ceilings, using recent CloudWatch metrics.
 
 Limitations:
-  - Requires AWS credentials with permissions: ec2:DescribeVolumes, cloudwatch:GetMetricStatistics
+  - Requires AWS credentials with permissions: ec2:DescribeVolumes, cloudwatch:GetMetricData
   - This is a heuristic; it does not guarantee saturation. Always validate with
     detailed workload profiling.
 
@@ -36,13 +36,29 @@ Exit codes:
 from __future__ import annotations
 import argparse
 import datetime as dt
+import json
 import math
 import sys
-from typing import Dict, List, Tuple
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Sequence, Tuple
 import boto3
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
 
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
 DEFAULT_VOLUME_TYPES = ["gp2", "gp3"]
+# Room for concurrent metric fetches; adaptive retries back off client-side when throttled.
+BOTO_CFG = Config(max_pool_connections=64, retries={'mode': 'adaptive', 'max_attempts': 8})
 SUPPORTED_TYPES = ["gp2", "gp3", "io1", "io2"]
 
 
@@ -56,6 +72,7 @@ def parse_args():
     p.add_argument("--breach-windows", type=int, default=3, help="Number of windows exceeding 90% baseline to flag (default 3)")
     p.add_argument("--min-baseline-iops", type=int, default=1000, help="Flag gp2 volumes whose baseline < this (default 1000)")
     p.add_argument("--json", action="store_true", help="JSON output")
+    p.add_argument("--workers", type=int, default=32, help="Volume pages analyzed concurrently (default 32)")
     return p.parse_args()
 
 
@@ -64,7 +81,7 @@ def client_for(service: str, profile: str = None, region: str = None):
     if profile:
         session_args['profile_name'] = profile
     session = boto3.Session(**session_args) if session_args else boto3.Session()
-    return session.client(service, region_name=region) if region else session.client(service)
+    return session.client(service, region_name=region, config=BOTO_CFG) if region else session.client(service, config=BOTO_CFG)
 
 
 def gp2_baseline(size_gib: int) -> int:
@@ -72,37 +89,52 @@ def gp2_baseline(size_gib: int) -> int:
     return max(100, min(16000, 3 * size_gib))
 
 
-def fetch_iops_metrics(cw, volume_id: str, start: dt.datetime, end: dt.datetime, period: int):
+def fetch_iops_metrics(cw, volumes, start: dt.datetime, end: dt.datetime, period: int) -> Dict[str, Sequence[float]]:
     # CloudWatch Namespace: AWS/EBS Metrics: VolumeReadOps, VolumeWriteOps
-    dims = [{'Name': 'VolumeId', 'Value': volume_id}]
-    metrics = {}
-    for metric_name in ['VolumeReadOps', 'VolumeWriteOps']:
-        resp = cw.get_metric_statistics(
-            Namespace='AWS/EBS',
-            MetricName=metric_name,
-            Dimensions=dims,
-            StartTime=start,
-            EndTime=end,
-            Period=period,
-            Statistics=['Sum'],
-        )
-        metrics[metric_name] = resp.get('Datapoints', [])
-    # Align timestamps: map timestamp -> (read_sum, write_sum)
-    points: Dict[dt.datetime, Dict[str, float]] = {}
-    for dp in metrics['VolumeReadOps']:
-        points.setdefault(dp['Timestamp'], {})['r'] = dp['Sum']
-    for dp in metrics['VolumeWriteOps']:
-        points.setdefault(dp['Timestamp'], {})['w'] = dp['Sum']
-    series = []
-    for ts, vals in sorted(points.items()):
-        read_sum = vals.get('r', 0.0)
-        write_sum = vals.get('w', 0.0)
-        total_iops = (read_sum + write_sum) / period
-        series.append({'timestamp': ts, 'iops': total_iops})
-    return series
-
-
-def analyze_volume(vol, metrics_series, vol_type: str, breach_windows: int, min_baseline_iops: int):
+    # One GetMetricData query per (volume, metric), up to 500 queries per request.
+    queries = []
+    for i, vol in enumerate(volumes):
+        dims = [{'Name': 'VolumeId', 'Value': vol['VolumeId']}]
+        for prefix, metric_name in (('r', 'VolumeReadOps'), ('w', 'VolumeWriteOps')):
+            queries.append({
+                'Id': f'{prefix}{i}',
+                'MetricStat': {
+                    'Metric': {'Namespace': 'AWS/EBS', 'MetricName': metric_name, 'Dimensions': dims},
+                    'Period': period,
+                    'Stat': 'Sum',
+                },
+                'ReturnData': True,
+            })
+    # Align timestamps per volume: timestamp -> [read_sum, write_sum]
+    points: List[Dict[dt.datetime, List[float]]] = [defaultdict(lambda: [0.0, 0.0]) for _ in volumes]
+    for n in range(0, len(queries), 500):
+        kwargs = {'MetricDataQueries': queries[n:n + 500], 'StartTime': start, 'EndTime': end}
+        while True:
+            resp = cw.get_metric_data(**kwargs)
+            for res in resp.get('MetricDataResults', []):
+                slot = 0 if res['Id'][0] == 'r' else 1
+                vol_points = points[int(res['Id'][1:])]
+                for ts, val in zip(res.get('Timestamps', []), res.get('Values', [])):
+                    vol_points[ts][slot] = val
+            token = resp.get('NextToken')
+            if not token:
+                break
+            kwargs['NextToken'] = token
+    # Only the per-period IOPS values (in timestamp order) are needed downstream.
+    out = {}
+    for vol, vol_points in zip(volumes, points):
+        iops = ((r + w) / period for _, (r, w) in sorted(vol_points.items()))
+        out[vol['VolumeId']] = np.fromiter(iops, dtype=np.float64, count=len(vol_points)) if np is not None else list(iops)
+    return out
+
+
+def count_at_or_above(values, threshold: float) -> int:
+    if np is not None:
+        return int((values >= threshold).sum())
+    return sum(1 for v in values if v >= threshold)
+
+
+def analyze_volume(vol, iops_values: Sequence[float], vol_type: str, breach_windows: int, min_baseline_iops: int):
     size = vol.get('Size')
     result = {
         'VolumeId': vol['VolumeId'],
@@ -114,12 +146,15 @@ def analyze_volume(vol, metrics_series, vol_type: str, breach_windows: int, min_
         'BreachWindows': 0,
         'Reasons': [],
     }
-    if not metrics_series:
+    if len(iops_values) == 0:
         result['Reasons'].append('no-metrics')
         return result
-    iops_values = [p['iops'] for p in metrics_series]
-    max_iops = max(iops_values)
-    avg_iops = sum(iops_values) / len(iops_values)
+    if np is not None:
+        max_iops = float(iops_values.max())
+        avg_iops = float(iops_values.mean())
+    else:
+        max_iops = max(iops_values)
+        avg_iops = sum(iops_values) / len(iops_values)
     result['MaxIOPS'] = round(max_iops, 2)
     result['AvgIOPS'] = round(avg_iops, 2)
 
@@ -127,7 +162,7 @@ def analyze_volume(vol, metrics_series, vol_type: str, breach_windows: int, min_
         baseline = gp2_baseline(size)
         result['BaselineOrProvisioned'] = baseline
         threshold = 0.9 * baseline
-        breach_count = sum(1 for v in iops_values if v >= threshold)
+        breach_count = count_at_or_above(iops_values, threshold)
         result['BreachWindows'] = breach_count
         if breach_count >= breach_windows:
             result['Reasons'].append('near-baseline-saturation')
@@ -138,7 +173,7 @@ def analyze_volume(vol, metrics_series, vol_type: str, breach_windows: int, min_
         provisioned = vol.get('Iops') or 3000
         result['BaselineOrProvisioned'] = provisioned
         threshold = 0.9 * provisioned
-        breach_count = sum(1 for v in iops_values if v >= threshold)
+        breach_count = count_at_or_above(iops_values, threshold)
         result['BreachWindows'] = breach_count
         if breach_count >= breach_windows:
             result['Reasons'].append('near-provisioned-saturation')
@@ -148,7 +183,7 @@ def analyze_volume(vol, metrics_series, vol_type: str, breach_windows: int, min_
         result['BaselineOrProvisioned'] = provisioned
         if provisioned:
             threshold = 0.9 * provisioned
-            breach_count = sum(1 for v in iops_values if v >= threshold)
+            breach_count = count_at_or_above(iops_values, threshold)
             result['BreachWindows'] = breach_count
             if breach_count >= breach_windows:
                 result['Reasons'].append('near-provisioned-saturation')
@@ -158,6 +193,25 @@ def analyze_volume(vol, metrics_series, vol_type: str, breach_windows: int, min_
     return result
 
 
+def write_json(payload) -> None:
+    if orjson is not None:
+        # Datetimes are passed through to default=str so output matches the stdlib path.
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(payload, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME))
+        sys.stdout.buffer.write(b'\n')
+        return
+    json.dump(payload, sys.stdout, default=str, indent=2)
+    sys.stdout.write('\n')
+
+
+def audit_volumes(cw, volumes, start: dt.datetime, end: dt.datetime, args) -> List[Dict]:
+    iops_by_volume = fetch_iops_metrics(cw, volumes, start, end, args.period)
+    return [
+        analyze_volume(vol, iops_by_volume[vol['VolumeId']], vol['VolumeType'], args.breach_windows, args.min_baseline_iops)
+        for vol in volumes
+    ]
+
+
 def main():
     args = parse_args()
     include_types = [t.strip() for t in (args.include.split(',') if args.include else DEFAULT_VOLUME_TYPES) if t.strip()]
@@ -167,27 +221,25 @@ def main():
         ec2 = client_for('ec2', args.profile, args.region)
         cw = client_for('cloudwatch', args.profile, args.region)
 
-        vols_resp = ec2.describe_volumes(Filters=[{'Name': 'volume-type', 'Values': include_types}])
-        volumes = vols_resp.get('Volumes', [])
-        if not volumes:
-            print('No volumes found for specified types.')
-            return
-
-        end = dt.datetime.utcnow()
+        end = dt.datetime.now(dt.timezone.utc)
         start = end - dt.timedelta(minutes=args.lookback_minutes)
 
-        results = []
-        for vol in volumes:
-            series = fetch_iops_metrics(cw, vol['VolumeId'], start, end, args.period)
-            analyzed = analyze_volume(vol, series, vol['VolumeType'], args.breach_windows, args.min_baseline_iops)
-            results.append(analyzed)
+        # Each page of volumes is handed to the pool as soon as it arrives, so metric
+        # fetches overlap with the remaining DescribeVolumes pages.
+        paginator = ec2.get_paginator('describe_volumes')
+        pages = paginator.paginate(Filters=[{'Name': 'volume-type', 'Values': include_types}], PaginationConfig={'PageSize': 500})
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            futures = [pool.submit(audit_volumes, cw, page['Volumes'], start, end, args) for page in pages if page.get('Volumes')]
+            results = [r for f in futures for r in f.result()]
+        if not results:
+            print('No volumes found for specified types.')
+            return
 
         # Filter to those with Reasons unless json wants full dataset
         flagged = [r for r in results if r['Reasons']]
 
         if args.json:
-            import json
-            print(json.dumps({'volumes': results, 'flagged': flagged}, default=str, indent=2))
+            write_json({'volumes': results, 'flagged': flagged})
             return
 
         print(f"Analyzed {len(results)} volumes (types: {','.join(include_types)}) lookback={args.lookback_minutes}m period={args.period}s")
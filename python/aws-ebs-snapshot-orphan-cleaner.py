@@ -1,14 +1,71 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
 import boto3
+from botocore.config import Config
+
+# Adaptive retries back off client-side when concurrent deletes are throttled.
+ec2 = boto3.client('ec2', config=Config(max_pool_connections=20, retries={'mode': 'adaptive', 'max_attempts': 10}))
+# Copied snapshots (cross-region/cross-account DR copies) report this placeholder instead of a real source volume.
+COPY_VOLUME_ID = 'vol-ffffffff'
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Find (and optionally delete) EBS snapshots whose source volume no longer exists")
+    p.add_argument("--apply", action="store_true", help="Delete orphaned snapshots")
+    p.add_argument("--max-delete", type=int, default=100, help="Max snapshots to delete (default: 100)")
+    p.add_argument("--workers", type=int, default=20, help="Concurrent deletes (default: 20)")
+    return p.parse_args()
+
+def volume_ids():
+    # DescribeVolumes is paginated; a partial set would mark live volumes' snapshots as orphaned.
+    ids = set()
+    for page in ec2.get_paginator('describe_volumes').paginate(PaginationConfig={'PageSize': 500}):
+        ids.update(v['VolumeId'] for v in page['Volumes'])
+    return ids
 
-ec2 = boto3.client('ec2')
+def snapshots():
+    # Only completed snapshots are candidates; filtering server-side keeps in-progress ones off the wire.
+    pages = ec2.get_paginator('describe_snapshots').paginate(
+        OwnerIds=['self'],
+        Filters=[{'Name': 'status', 'Values': ['completed']}],
+        PaginationConfig={'PageSize': 500},
+    )
+    for page in pages:
+        yield from page['Snapshots']
+
+def delete_snapshot(snapshot_id):
+    try:
+        ec2.delete_snapshot(SnapshotId=snapshot_id)
+        return None
+    except Exception as e:
+        return str(e)
 
 def main():
-    snapshots = ec2.describe_snapshots(OwnerIds=['self'])['Snapshots']
-    volumes = {v['VolumeId'] for v in ec2.describe_volumes()['Volumes']}
-    for snap in snapshots:
-        if snap.get('VolumeId') not in volumes:
+    args = parse_args()
+    volumes = volume_ids()
+    orphans = []
+    for snap in snapshots():
+        # Snapshots without a source volume id cannot be matched against the volume set, and copies
+        # never had a volume here; neither is an orphan.
+        if not snap.get('VolumeId') or snap['VolumeId'] == COPY_VOLUME_ID:
+            continue
+        if snap.get('Description', '').startswith('[Copied '):
+            continue
+        if snap['VolumeId'] not in volumes:
             print(f"Orphaned snapshot: {snap['SnapshotId']} (Volume: {snap.get('VolumeId')})")
-            # Uncomment to delete: ec2.delete_snapshot(SnapshotId=snap['SnapshotId'])
+            orphans.append(snap['SnapshotId'])
+
+    if not args.apply:
+        if orphans:
+            print("\nDry-run only. Use --apply to delete orphaned snapshots.")
+        return
+
+    # Deletes are independent of each other, so they run concurrently up to --max-delete.
+    to_delete = orphans[:args.max_delete]
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        errors = list(pool.map(delete_snapshot, to_delete))
+    for snapshot_id, err in zip(to_delete, errors):
+        print(f"Delete {snapshot_id}: {'ERR ' + err if err else 'OK'}")
 
 if __name__ == "__main__":
     main()
@@ -35,11 +35,26 @@ Exit Codes:
 import argparse
 import boto3
 import datetime as dt
+import functools
+import itertools
 import json
+import os
 import sys
-from typing import List, Dict, Any, Optional
-
+import time
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
+# Larger pool for concurrent scans; adaptive retries back off client-side when throttled.
+BOTO_CFG = Config(max_pool_connections=50, retries={"mode": "adaptive", "max_attempts": 10},
+                  tcp_keepalive=True, user_agent_extra="audit-scripts/1.0")
 GB_COST = 0.10
+REGION_CACHE_TTL = 24 * 3600
 
 
 def parse_args():
@@ -53,6 +68,8 @@ def parse_args():
     p.add_argument("--snapshot-tag", action="append", help="Tags to set on created snapshots Key=Value (repeat)")
     p.add_argument("--max-apply", type=int, default=100, help="Max volumes to operate on")
     p.add_argument("--json", action="store_true", help="JSON output")
+    p.add_argument("--workers", type=int, default=16, help="Regions scanned concurrently (default 16)")
+    p.add_argument("--no-cache", action="store_true", help="Refresh the cached enabled-region list")
     return p.parse_args()
 
 
@@ -62,27 +79,51 @@ def session(profile: Optional[str]):
     return boto3.Session()
 
 
-def discover_regions(sess, explicit):
+@functools.lru_cache(maxsize=None)
+def get_client(sess, service: str, region: str):
+    return sess.client(service, region_name=region, config=BOTO_CFG)
+
+
+def discover_regions(sess, explicit, no_cache: bool = False):
     if explicit:
         return explicit
+    use_cache = not no_cache and os.environ.get("AUDITOR_NO_REGION_CACHE") != "1"
+    partition = sess.get_partition_for_region(sess.region_name or "us-east-1")
+    cache_path = os.path.expanduser(f"~/.cache/aws-audit/regions-{sess.profile_name}-{partition}.json")
+    if use_cache:
+        try:
+            if time.time() - os.path.getmtime(cache_path) < REGION_CACHE_TTL:
+                with open(cache_path) as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
     try:
-        ec2 = sess.client("ec2")
+        ec2 = get_client(sess, "ec2", sess.region_name or "us-east-1")
         resp = ec2.describe_regions(AllRegions=False)
-        return sorted(r["RegionName"] for r in resp["Regions"])
+        found = sorted(r["RegionName"] for r in resp["Regions"])
     except Exception:
         return ["us-east-1"]
-
-
-def parse_tag_filters(required: Optional[List[str]]):
+    if os.environ.get("AUDITOR_NO_REGION_CACHE") != "1":
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(found, f)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass
+    return found
+
+
+def parse_tag_filters(required: Optional[List[str]]) -> Tuple[Tuple[str, str], ...]:
+    # (key, value) pairs; a repeated key keeps its last value.
     out = {}
-    if not required:
-        return out
-    for r in required:
+    for r in required or []:
         if "=" not in r:
             continue
         k, v = r.split("=", 1)
         out[k.strip()] = v.strip()
-    return out
+    return tuple(out.items())
 
 
 def parse_snapshot_tags(tags: Optional[List[str]]):
@@ -99,31 +140,25 @@ def tags_dict(tags_list: List[Dict[str, str]]):
     return {t.get('Key'): t.get('Value') for t in (tags_list or [])}
 
 
-def matches_required(vol: Dict[str, Any], needed: Dict[str, str]):
-    if not needed:
-        return True
-    t = tags_dict(vol.get('Tags', []))
-    for k, v in needed.items():
-        if t.get(k) != v:
+def matches_required(tags: List[Dict[str, str]], needed: Tuple[Tuple[str, str], ...]):
+    # Scans the raw tag list; volumes that fail the filter never get a dict built.
+    for k, v in needed:
+        for t in tags:
+            if t.get('Key') == k:
+                if t.get('Value') != v:
+                    return False
+                break
+        else:
             return False
     return True
 
 
 def list_available_volumes(ec2):
-    out = []
-    token = None
-    while True:
-        kwargs = {"MaxResults": 500, "Filters": [
-            {"Name": "status", "Values": ["available"]}
-        ]}
-        if token:
-            kwargs["NextToken"] = token
-        resp = ec2.describe_volumes(**kwargs)
-        out.extend(resp.get("Volumes", []))
-        token = resp.get("NextToken")
-        if not token:
-            break
-    return out
+    # Yield page by page so callers can filter while later pages are still being fetched.
+    paginator = ec2.get_paginator("describe_volumes")
+    pages = paginator.paginate(Filters=[{"Name": "status", "Values": ["available"]}], PaginationConfig={"PageSize": 500})
+    for page in pages:
+        yield from page.get("Volumes", [])
 
 
 def create_snapshot(ec2, volume_id: str, description: str, tags: List[Dict[str, str]]):
@@ -152,38 +187,23 @@ def human_size_gb(gb: int) -> str:
     return f"{gb}GB"
 
 
-def main():
-    args = parse_args()
-    sess = session(args.profile)
-    regs = discover_regions(sess, args.regions)
-    needed_tags = parse_tag_filters(args.required_tag)
-    snap_tags = parse_snapshot_tags(args.snapshot_tag)
-    now = dt.datetime.utcnow()
-
-    results = []
-    operated = 0
-
-    for region in regs:
-        ec2 = sess.client("ec2", region_name=region)
-        try:
-            vols = list_available_volumes(ec2)
-        except Exception as e:
-            print(f"WARN region {region} list volumes failed: {e}", file=sys.stderr)
-            continue
-        for v in vols:
-            if not matches_required(v, needed_tags):
+def scan_region(args, ec2, region: str, needed_tags: Tuple[Tuple[str, str], ...], now: dt.datetime,
+                cutoff: Optional[dt.datetime]) -> List[Dict[str, Any]]:
+    out = []
+    try:
+        for v in list_available_volumes(ec2):
+            if needed_tags and not matches_required(v.get('Tags') or (), needed_tags):
                 continue
             created = v.get('CreateTime')
-            age_days = None
-            if created:
-                if created.tzinfo:
-                    created = created.astimezone(dt.timezone.utc).replace(tzinfo=None)
-                age_days = (now - created).days
-            if args.older_than_days is not None and age_days is not None and age_days < args.older_than_days:
+            if created and created.tzinfo is None:
+                created = created.replace(tzinfo=dt.timezone.utc)
+            # Younger than the cutoff is the same test as age_days < --older-than-days.
+            if cutoff is not None and created and created > cutoff:
                 continue
+            age_days = (now - created).days if created else None
             size = v.get('Size', 0)
             cost = round(size * GB_COST, 2)
-            rec = {
+            out.append({
                 'region': region,
                 'volume_id': v.get('VolumeId'),
                 'size_gb': size,
@@ -197,29 +217,93 @@ def main():
                 'snapshot_error': None,
                 'delete_attempted': False,
                 'delete_error': None,
-            }
-            if args.apply and operated < args.max_apply:
-                snap_id = None
-                if args.snapshot_before_delete:
-                    desc = f"Pre-delete snapshot of {rec['volume_id']} via auditor"
-                    snap_id, snap_err = create_snapshot(ec2, rec['volume_id'], desc, snap_tags)
-                    rec['snapshot_id'] = snap_id
-                    rec['snapshot_error'] = snap_err
-                del_err = delete_volume(ec2, rec['volume_id'])
-                rec['delete_attempted'] = True
-                rec['delete_error'] = del_err
-                operated += 1
-            results.append(rec)
+            })
+    except Exception as e:
+        print(f"WARN region {region} list volumes failed: {e}", file=sys.stderr)
+        return []
+    return out
+
+
+def print_table(header: List[str], rows, sample: int = 1000) -> int:
+    """Stream rows as an aligned table; column widths come from the first `sample` rows."""
+    rows = iter(rows)
+    head = [[str(c) for c in header]]
+    head.extend([str(c) for c in row] for row in itertools.islice(rows, sample))
+    if len(head) == 1:
+        return 0
+    widths = [0] * len(header)
+    for row in head:
+        for j, c in enumerate(row):
+            if len(c) > widths[j]:
+                widths[j] = len(c)
+    fmt = "  ".join(f"{{:<{w}}}" for w in widths)
+    out = sys.stdout
+    out.write(fmt.format(*head[0]) + "\n" + "  ".join("-" * w for w in widths) + "\n")
+    out.write("".join(fmt.format(*row) + "\n" for row in head[1:]))
+    count = len(head) - 1
+    buf = []
+    for row in rows:
+        buf.append(fmt.format(*[str(c) for c in row]) + "\n")
+        count += 1
+        if len(buf) >= 256:
+            out.write("".join(buf))
+            buf.clear()
+    out.write("".join(buf))
+    return count
+
+
+def write_json(payload) -> None:
+    if orjson is not None:
+        # Datetimes are passed through to default=str so output matches the stdlib path.
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(payload, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME))
+        sys.stdout.buffer.write(b"\n")
+        return
+    json.dump(payload, sys.stdout, indent=2, default=str)
+    sys.stdout.write("\n")
+
+
+def main():
+    args = parse_args()
+    sess = session(args.profile)
+    regs = discover_regions(sess, args.regions, args.no_cache)
+    needed_tags = parse_tag_filters(args.required_tag)
+    snap_tags = parse_snapshot_tags(args.snapshot_tag)
+    now = dt.datetime.now(dt.timezone.utc)
+    cutoff = now - dt.timedelta(days=args.older_than_days) if args.older_than_days is not None else None
+
+    for r in regs:
+        get_client(sess, "ec2", r)
+
+    results = []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(regs)))) as pool:
+        for region_results in pool.map(lambda r: scan_region(args, get_client(sess, "ec2", r), r, needed_tags, now, cutoff), regs):
+            results.extend(region_results)
+
+    def apply_one(rec):
+        ec2 = get_client(sess, "ec2", rec['region'])
+        if args.snapshot_before_delete:
+            desc = f"Pre-delete snapshot of {rec['volume_id']} via auditor"
+            rec['snapshot_id'], rec['snapshot_error'] = create_snapshot(ec2, rec['volume_id'], desc, snap_tags)
+        rec['delete_error'] = delete_volume(ec2, rec['volume_id'])
+        rec['delete_attempted'] = True
+
+    if args.apply:
+        # --max-apply counts attempts, so the first records in region order are the ones operated on.
+        # Volumes are independent of each other; their snapshot + delete pairs run concurrently.
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(apply_one, results[:args.max_apply]))
 
     if args.json:
-        print(json.dumps({
+        write_json({
             'regions': regs,
             'older_than_days': args.older_than_days,
             'apply': args.apply,
             'snapshot_before_delete': args.snapshot_before_delete,
             'max_apply': args.max_apply,
             'results': results,
-        }, indent=2))
+        })
         return 0
 
     if not results:
@@ -227,21 +311,14 @@ def main():
         return 0
 
     header = ["Region", "Volume", "Size", "Age(d)", "Cost", "Snap", "Deleted"]
-    rows = [header]
-    for r in results:
-        rows.append([
+    print_table(header, (
+        [
             r['region'], r['volume_id'], human_size_gb(r['size_gb']), r.get('age_days'), f"${r['estimated_monthly_cost_usd']:.2f}",
             (r['snapshot_id'] or ("ERR" if r['snapshot_error'] else "-")),
-            ("Y" if r['delete_attempted'] and not r['delete_error'] else ("ERR" if r['delete_error'] else "N"))
-        ])
-    widths = [max(len(str(row[i])) for row in rows) for i in range(len(header))]
-    for i, row in enumerate(rows):
-        line = "  ".join(str(cell).ljust(widths[j]) for j, cell in enumerate(row))
-        if i == 0:
-            print(line)
-            print("  ".join("-" * w for w in widths))
-        else:
-            print(line)
+            ("Y" if r['delete_attempted'] and not r['delete_error'] else ("ERR" if r['delete_error'] else "N")),
+        ]
+        for r in results
+    ))
     if not args.apply:
         print("\nDry-run only. Use --apply to delete flagged volumes. Add --snapshot-before-delete to create a snapshot first.")
     return 0
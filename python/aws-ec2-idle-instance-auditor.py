@@ -27,7 +27,7 @@ Safety Notes:
 
 Permissions Required:
   - ec2:DescribeInstances, ec2:StopInstances, ec2:DescribeTags (covered by DescribeInstances), ec2:CreateTags
-  - cloudwatch:GetMetricStatistics
+  - cloudwatch:GetMetricData
   - ec2:DescribeRegions
 
 Examples:
@@ -43,11 +43,31 @@ Exit Codes:
 import argparse
 import boto3
 import datetime as dt
+import functools
+import itertools
 import json
+import os
 import sys
-from typing import Any, Dict, List, Optional
-
+import time
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
+# Larger pool for concurrent scans; adaptive retries back off client-side when throttled.
+BOTO_CFG = Config(max_pool_connections=50, retries={"mode": "adaptive", "max_attempts": 10},
+                  tcp_keepalive=True, user_agent_extra="audit-scripts/1.0")
 CW_NS = "AWS/EC2"
+REGION_CACHE_TTL = 24 * 3600
+# (metric, statistic) fetched per instance, in the order instance_metrics() returns them
+METRICS = (("CPUUtilization", "Average"), ("NetworkIn", "Sum"), ("NetworkOut", "Sum"))
+# Instance ids per CreateTags / StopInstances call
+TAG_BATCH = 20
+STOP_BATCH = 1000
 
 
 def parse_args():
@@ -70,6 +90,8 @@ def parse_args():
     p.add_argument("--max-stop", type=int, default=5, help="Max instances to stop (default: 5)")
     p.add_argument("--ci-exit-on-findings", action="store_true", help="Exit code 2 if any idle instances flagged (CI integration)")
     p.add_argument("--json", action="store_true", help="JSON output")
+    p.add_argument("--workers", type=int, default=16, help="Regions scanned concurrently (default 16)")
+    p.add_argument("--no-cache", action="store_true", help="Refresh the cached enabled-region list")
     return p.parse_args()
 
 
@@ -79,190 +101,275 @@ def session(profile: Optional[str]):
     return boto3.Session()
 
 
-def discover_regions(sess, explicit):
+@functools.lru_cache(maxsize=None)
+def get_client(sess, service: str, region: str):
+    return sess.client(service, region_name=region, config=BOTO_CFG)
+
+
+def discover_regions(sess, explicit, no_cache: bool = False):
     if explicit:
         return explicit
+    use_cache = not no_cache and os.environ.get("AUDITOR_NO_REGION_CACHE") != "1"
+    partition = sess.get_partition_for_region(sess.region_name or "us-east-1")
+    cache_path = os.path.expanduser(f"~/.cache/aws-audit/regions-{sess.profile_name}-{partition}.json")
+    if use_cache:
+        try:
+            if time.time() - os.path.getmtime(cache_path) < REGION_CACHE_TTL:
+                with open(cache_path) as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
     try:
-        ec2 = sess.client("ec2")
+        ec2 = get_client(sess, "ec2", sess.region_name or "us-east-1")
         resp = ec2.describe_regions(AllRegions=False)
-        return sorted(r["RegionName"] for r in resp["Regions"])
+        found = sorted(r["RegionName"] for r in resp["Regions"])
     except Exception:
         return ["us-east-1"]
-
-
-def parse_exclude_tags(ex: Optional[List[str]]) -> Dict[str, str]:
+    if os.environ.get("AUDITOR_NO_REGION_CACHE") != "1":
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(found, f)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass
+    return found
+
+
+def parse_exclude_tags(ex: Optional[List[str]]) -> Tuple[Tuple[str, str], ...]:
+    # (key, value) pairs; a repeated key keeps its last value.
     out: Dict[str, str] = {}
-    if not ex:
-        return out
-    for item in ex:
+    for item in ex or []:
         if "=" not in item:
             continue
         k, v = item.split("=", 1)
         out[k.strip()] = v.strip()
+    return tuple(out.items())
+
+
+def instance_metrics(cw, region: str, instance_ids: List[str], start: dt.datetime, end: dt.datetime, period: int,
+                     which: Sequence[int] = range(len(METRICS))) -> Dict[str, List[Optional[float]]]:
+    """Average CPUUtilization and summed NetworkIn/NetworkOut per instance via batched GetMetricData.
+
+    Only the METRICS positions in `which` are fetched. A value is None when it was not
+    fetched, its request failed, or CloudWatch returned no datapoints for it.
+    """
+    out: Dict[str, List[Optional[float]]] = {iid: [None] * len(METRICS) for iid in instance_ids}
+    queries = []
+    keys = {}
+    for i, iid in enumerate(instance_ids):
+        for j in which:
+            metric, stat = METRICS[j]
+            qid = f"m{i}_{j}"
+            keys[qid] = (iid, j)
+            queries.append({
+                "Id": qid,
+                "MetricStat": {
+                    "Metric": {"Namespace": CW_NS, "MetricName": metric, "Dimensions": [{"Name": "InstanceId", "Value": iid}]},
+                    "Period": period,
+                    "Stat": stat,
+                },
+                "ReturnData": True,
+            })
+    # GetMetricData takes up to 500 queries per request; a series may span several NextToken pages.
+    values: Dict[str, List[float]] = {qid: [] for qid in keys}
+    for n in range(0, len(queries), 500):
+        batch = queries[n:n + 500]
+        kwargs = {"MetricDataQueries": batch, "StartTime": start, "EndTime": end}
+        try:
+            while True:
+                resp = cw.get_metric_data(**kwargs)
+                for res in resp.get("MetricDataResults", []):
+                    values[res["Id"]].extend(res.get("Values", []))
+                token = resp.get("NextToken")
+                if not token:
+                    break
+                kwargs["NextToken"] = token
+        except Exception as e:
+            # A failure mid-pagination leaves partial sums that would understate traffic; drop the whole batch.
+            for q in batch:
+                values[q["Id"]] = []
+            failed = sorted({keys[q["Id"]][0] for q in batch})
+            print(f"WARN region {region} get_metric_data failed, metrics missing for {len(failed)} instance(s): {e}",
+                  file=sys.stderr)
+    for qid, vals in values.items():
+        if not vals:
+            continue
+        iid, j = keys[qid]
+        out[iid][j] = sum(vals) / len(vals) if METRICS[j][1] == "Average" else float(sum(vals))
     return out
 
 
-def instance_name(tags: Optional[List[Dict[str, Any]]]) -> Optional[str]:
-    if not tags:
-        return None
-    for t in tags:
-        if t.get("Key") == "Name":
-            return t.get("Value")
-    return None
-
-
-def cw_avg_metric(cw, instance_id: str, metric: str, start: dt.datetime, end: dt.datetime, period: int) -> Optional[float]:
+def tag_instances(ec2, ids: List[str], key: str, value: str) -> Optional[str]:
     try:
-        resp = cw.get_metric_statistics(
-            Namespace=CW_NS,
-            MetricName=metric,
-            Dimensions=[{"Name": "InstanceId", "Value": instance_id}],
-            StartTime=start,
-            EndTime=end,
-            Period=period,
-            Statistics=["Average"],
-        )
-        pts = resp.get("Datapoints", [])
-        if not pts:
-            return None
-        vals = [float(p.get("Average", 0.0)) for p in pts]
-        return sum(vals) / len(vals)
-    except Exception:
+        ec2.create_tags(Resources=ids, Tags=[{"Key": key, "Value": value}])
         return None
+    except Exception as e:
+        return str(e)
 
 
-def cw_sum_metric(cw, instance_id: str, metric: str, start: dt.datetime, end: dt.datetime, period: int) -> Optional[float]:
-    try:
-        resp = cw.get_metric_statistics(
-            Namespace=CW_NS,
-            MetricName=metric,
-            Dimensions=[{"Name": "InstanceId", "Value": instance_id}],
-            StartTime=start,
-            EndTime=end,
-            Period=period,
-            Statistics=["Sum"],
-        )
-        pts = resp.get("Datapoints", [])
-        if not pts:
-            return None
-        return float(sum(p.get("Sum", 0.0) for p in pts))
-    except Exception:
-        return None
+def apply_tags(ec2, recs: List[Dict[str, Any]], key: str, value: str, limit: int) -> int:
+    """Tag up to `limit` of the instances in `recs`, TAG_BATCH per call; returns how many were tagged."""
+    tagged = 0
+    i = 0
+    while i < len(recs) and tagged < limit:
+        batch = recs[i:i + min(TAG_BATCH, limit - tagged)]
+        i += len(batch)
+        err = tag_instances(ec2, [r["instance_id"] for r in batch], key, value)
+        for r in batch:
+            r["tag_attempted"] = True
+            # A failed batch is retried one instance at a time so each record gets its own error.
+            r["tag_error"] = tag_instances(ec2, [r["instance_id"]], key, value) if err else None
+            if r["tag_error"] is None:
+                tagged += 1
+    return tagged
 
 
-def tag_instance(ec2, instance_id: str, key: str, value: str) -> Optional[str]:
+def stop_instances(ec2, ids: List[str]) -> Optional[str]:
     try:
-        ec2.create_tags(Resources=[instance_id], Tags=[{"Key": key, "Value": value}])
+        ec2.stop_instances(InstanceIds=ids)
         return None
     except Exception as e:
         return str(e)
 
 
-def stop_instances(ec2, ids: List[str]) -> Optional[str]:
+def scan_region(args, ec2, cw, region: str, exclude_tags: Tuple[Tuple[str, str], ...], start: dt.datetime, end: dt.datetime) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    candidates = []
+    paginator = ec2.get_paginator("describe_instances")
     try:
-        ec2.stop_instances(InstanceIds=ids)
-        return None
+        # 1000 is the DescribeInstances page maximum; search() flattens reservations as pages arrive.
+        for inst in paginator.paginate(PaginationConfig={"PageSize": 1000}).search("Reservations[].Instances[]"):
+            state = inst.get("State", {}).get("Name")
+            if state != "running":
+                continue
+            iid = inst.get("InstanceId")
+            tag_map = {t.get("Key"): t.get("Value") for t in inst.get("Tags") or []}
+            name = tag_map.get("Name")
+            if args.name_filter and (args.name_filter not in (name or "") and args.name_filter not in iid):
+                continue
+            if exclude_tags and any(tag_map.get(k) == v for k, v in exclude_tags):
+                continue
+            candidates.append((iid, name))
     except Exception as e:
-        return str(e)
+        print(f"WARN region {region} describe_instances failed: {e}", file=sys.stderr)
+        return out
+
+    # CPU first: an instance already over --max-cpu-avg is not idle whatever its network
+    # traffic, so NetworkIn/NetworkOut are only requested for the rest.
+    metrics = instance_metrics(cw, region, [iid for iid, _ in candidates], start, end, args.period, which=(0,))
+    candidates = [(iid, name) for iid, name in candidates if metrics[iid][0] is None or metrics[iid][0] <= args.max_cpu_avg]
+    net = instance_metrics(cw, region, [iid for iid, _ in candidates], start, end, args.period, which=(1, 2))
+    for iid, _ in candidates:
+        metrics[iid][1:] = net[iid][1:]
+
+    for iid, name in candidates:
+        cpu_avg, net_in, net_out = metrics[iid]
+        metrics_missing = (cpu_avg is None) or (net_in is None) or (net_out is None)
+        if metrics_missing and not args.treat_missing_metrics_idle:
+            continue  # conservative; treat active
+
+        cpu_v = cpu_avg if cpu_avg is not None else 0.0
+        net_total_bytes = (net_in or 0.0) + (net_out or 0.0)
+        net_total_mb = net_total_bytes / (1024 * 1024)
+
+        idle = (cpu_v <= args.max_cpu_avg) and (net_total_mb <= args.max_network_mb)
+        if not idle:
+            continue
+
+        out.append({
+            "region": region,
+            "instance_id": iid,
+            "name": name,
+            "cpu_avg": cpu_v,
+            "network_mb": net_total_mb,
+            "metrics_missing": metrics_missing,
+            "tag_attempted": False,
+            "tag_error": None,
+            "stop_attempted": False,
+            "stop_error": None,
+        })
+    return out
+
+
+def print_table(header: List[str], rows, sample: int = 1000) -> int:
+    """Stream rows as an aligned table; column widths come from the first `sample` rows."""
+    rows = iter(rows)
+    head = [[str(c) for c in header]]
+    head.extend([str(c) for c in row] for row in itertools.islice(rows, sample))
+    if len(head) == 1:
+        return 0
+    widths = [0] * len(header)
+    for row in head:
+        for j, c in enumerate(row):
+            if len(c) > widths[j]:
+                widths[j] = len(c)
+    fmt = "  ".join(f"{{:<{w}}}" for w in widths)
+    out = sys.stdout
+    out.write(fmt.format(*head[0]) + "\n" + "  ".join("-" * w for w in widths) + "\n")
+    out.write("".join(fmt.format(*row) + "\n" for row in head[1:]))
+    count = len(head) - 1
+    buf = []
+    for row in rows:
+        buf.append(fmt.format(*[str(c) for c in row]) + "\n")
+        count += 1
+        if len(buf) >= 256:
+            out.write("".join(buf))
+            buf.clear()
+    out.write("".join(buf))
+    return count
+
+
+def write_json(payload) -> None:
+    if orjson is not None:
+        # Datetimes are passed through to default=str so output matches the stdlib path.
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(payload, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME))
+        sys.stdout.buffer.write(b"\n")
+        return
+    json.dump(payload, sys.stdout, indent=2, default=str)
+    sys.stdout.write("\n")
 
 
 def main():
     args = parse_args()
     sess = session(args.profile)
-    regions = discover_regions(sess, args.regions)
+    regions = discover_regions(sess, args.regions, args.no_cache)
     exclude_tags = parse_exclude_tags(args.exclude_tag)
 
-    end = dt.datetime.utcnow()
+    end = dt.datetime.now(dt.timezone.utc)
     start = end - dt.timedelta(days=args.window_days)
 
+    for r in regions:
+        get_client(sess, "ec2", r)
+        get_client(sess, "cloudwatch", r)
+
     results: List[Dict[str, Any]] = []
     tagged = 0
     stopped = 0
-    to_stop: List[str] = []
 
-    for region in regions:
-        ec2 = sess.client("ec2", region_name=region)
-        cw = sess.client("cloudwatch", region_name=region)
-        paginator = ec2.get_paginator("describe_instances")
-        try:
-            for page in paginator.paginate():
-                for reservation in page.get("Reservations", []):
-                    for inst in reservation.get("Instances", []):
-                        state = inst.get("State", {}).get("Name")
-                        if state != "running":
-                            continue
-                        iid = inst.get("InstanceId")
-                        tags = inst.get("Tags") or []
-                        name = instance_name(tags)
-                        if args.name_filter and (args.name_filter not in (name or "") and args.name_filter not in iid):
-                            continue
-                        excluded = False
-                        for k, v in exclude_tags.items():
-                            for t in tags:
-                                if t.get("Key") == k and t.get("Value") == v:
-                                    excluded = True
-                                    break
-                            if excluded:
-                                break
-                        if excluded:
-                            continue
-
-                        cpu_avg = cw_avg_metric(cw, iid, "CPUUtilization", start, end, args.period)
-                        net_in = cw_sum_metric(cw, iid, "NetworkIn", start, end, args.period)
-                        net_out = cw_sum_metric(cw, iid, "NetworkOut", start, end, args.period)
-
-                        metrics_missing = (cpu_avg is None) or (net_in is None) or (net_out is None)
-                        if metrics_missing and not args.treat-missing-metrics-idle:
-                            continue  # conservative; treat active
-
-                        cpu_v = cpu_avg if cpu_avg is not None else 0.0
-                        net_total_bytes = (net_in or 0.0) + (net_out or 0.0)
-                        net_total_mb = net_total_bytes / (1024 * 1024)
-
-                        idle = (cpu_v <= args.max_cpu_avg) and (net_total_mb <= args.max_network_mb)
-                        if not idle:
-                            continue
-
-                        rec = {
-                            "region": region,
-                            "instance_id": iid,
-                            "name": name,
-                            "cpu_avg": cpu_v,
-                            "network_mb": net_total_mb,
-                            "metrics_missing": metrics_missing,
-                            "tag_attempted": False,
-                            "tag_error": None,
-                            "stop_attempted": False,
-                            "stop_error": None,
-                        }
-
-                        if idle and args.apply_tag and tagged < args.max_tag:
-                            err = tag_instance(ec2, iid, args.tag_key, args.tag_value)
-                            rec["tag_attempted"] = True
-                            rec["tag_error"] = err
-                            if err is None:
-                                tagged += 1
-
-                        if idle and args.apply_stop and args.confirm_stop and stopped < args.max_stop:
-                            to_stop.append(iid)
-                            rec["stop_attempted"] = True
-
-                        results.append(rec)
-        except Exception as e:
-            print(f"WARN region {region} describe_instances failed: {e}", file=sys.stderr)
-            continue
-
-        # Perform stop in region batches (after enumeration) respecting cap
-        if to_stop and args.apply_stop and args.confirm_stop and stopped < args.max_stop:
-            batch = to_stop[: (args.max_stop - stopped)]
-            err = stop_instances(ec2, batch)
-            if err:
-                for r in results:
-                    if r["instance_id"] in batch and r["stop_attempted"]:
+    # Tags and stops are applied serially here, in this thread, so the caps hold across regions.
+    with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(regions)))) as pool:
+        scans = pool.map(lambda r: scan_region(args, get_client(sess, "ec2", r), get_client(sess, "cloudwatch", r), r, exclude_tags, start, end), regions)
+        for region, region_results in zip(regions, scans):
+            ec2 = get_client(sess, "ec2", region)
+            if args.apply_tag and tagged < args.max_tag:
+                tagged += apply_tags(ec2, region_results, args.tag_key, args.tag_value, args.max_tag - tagged)
+
+            # Perform stop in region batches (after enumeration) respecting cap
+            if args.apply_stop and args.confirm_stop and stopped < args.max_stop:
+                to_stop = region_results[: (args.max_stop - stopped)]
+                for i in range(0, len(to_stop), STOP_BATCH):
+                    batch = to_stop[i:i + STOP_BATCH]
+                    err = stop_instances(ec2, [r["instance_id"] for r in batch])
+                    for r in batch:
+                        r["stop_attempted"] = True
                         r["stop_error"] = err
-            else:
-                stopped += len(batch)
-            to_stop = []  # reset per region
+                    if err is None:
+                        stopped += len(batch)
+
+            results.extend(region_results)
 
     payload = {
         "regions": regions,
@@ -277,7 +384,7 @@ def main():
     }
 
     if args.json:
-        print(json.dumps(payload, indent=2))
+        write_json(payload)
         if args.ci_exit_on_findings and results:
             return 2
         return 0
@@ -287,22 +394,15 @@ def main():
         return 0
 
     header = ["Region", "InstanceId", "Name", "CPUAvg", "NetMB", "Tagged", "Stopped", "MissingMetrics"]
-    rows = [header]
-    for r in results:
-        rows.append([
+    print_table(header, (
+        [
             r["region"], r["instance_id"], r.get("name") or "-", f"{r['cpu_avg']:.2f}", f"{r['network_mb']:.1f}",
             ("Y" if r["tag_attempted"] and not r["tag_error"] else ("ERR" if r["tag_error"] else "N")),
             ("Y" if r["stop_attempted"] and not r["stop_error"] else ("ERR" if r["stop_error"] else "N")),
             ("Y" if r["metrics_missing"] else "N"),
-        ])
-    widths = [max(len(str(row[i])) for row in rows) for i in range(len(header))]
-    for i, row in enumerate(rows):
-        line = '  '.join(str(cell).ljust(widths[j]) for j, cell in enumerate(row))
-        if i == 0:
-            print(line)
-            print('  '.join('-' * w for w in widths))
-        else:
-            print(line)
+        ]
+        for r in results
+    ))
 
     if not args.apply_tag and not (args.apply_stop and args.confirm_stop):
         print("\nDry-run. Use --apply-tag or --apply-stop --confirm-stop to take action.")
@@ -38,10 +38,14 @@ import argparse
 import boto3
 import datetime as dt
 import json
+import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
 GB_COST = 0.10  # USD per GB-month heuristic
+REGION_CACHE_TTL = 24 * 3600
 
 
 def parse_args():
@@ -54,6 +58,8 @@ def parse_args():
     p.add_argument("--mark", help="TAG=VALUE to apply to flagged instances")
     p.add_argument("--max-mark", type=int, default=200, help="Max instances to tag")
     p.add_argument("--json", action="store_true", help="JSON output")
+    p.add_argument("--workers", type=int, default=16, help="Regions scanned concurrently (default 16)")
+    p.add_argument("--no-cache", action="store_true", help="Refresh the cached enabled-region list")
     return p.parse_args()
 
 
@@ -63,15 +69,35 @@ def session(profile: Optional[str]):
     return boto3.Session()
 
 
-def discover_regions(sess, explicit):
+def discover_regions(sess, explicit, no_cache: bool = False):
     if explicit:
         return explicit
+    use_cache = not no_cache and os.environ.get("AUDITOR_NO_REGION_CACHE") != "1"
+    partition = sess.get_partition_for_region(sess.region_name or "us-east-1")
+    cache_path = os.path.expanduser(f"~/.cache/aws-audit/regions-{sess.profile_name}-{partition}.json")
+    if use_cache:
+        try:
+            if time.time() - os.path.getmtime(cache_path) < REGION_CACHE_TTL:
+                with open(cache_path) as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
     try:
         ec2 = sess.client("ec2")
         resp = ec2.describe_regions(AllRegions=False)
-        return sorted(r["RegionName"] for r in resp["Regions"])
+        found = sorted(r["RegionName"] for r in resp["Regions"])
     except Exception:
         return ["us-east-1"]
+    if os.environ.get("AUDITOR_NO_REGION_CACHE") != "1":
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(found, f)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass
+    return found
 
 
 def parse_tag_filters(required: Optional[List[str]]):
@@ -100,34 +126,27 @@ def instance_name(tags: List[Dict[str, str]]):
     return None
 
 
-def list_instances(ec2):
-    out = []
-    token = None
-    while True:
-        kwargs = {"MaxResults": 1000}
-        if token:
-            kwargs["NextToken"] = token
-        resp = ec2.describe_instances(**kwargs)
-        for r in resp.get("Reservations", []):
-            out.extend(r.get("Instances", []))
-        token = resp.get("NextToken")
-        if not token:
-            break
-    return out
+def iter_instances(ec2):
+    # 1000 is the DescribeInstances page maximum; instances are yielded as each page arrives.
+    paginator = ec2.get_paginator("describe_instances")
+    yield from paginator.paginate(PaginationConfig={"PageSize": 1000}).search("Reservations[].Instances[]")
+
+
+def describe_volume_chunk(ec2, chunk: List[str]):
+    # A VolumeIds request returns every listed volume in one response (MaxResults is not allowed with it).
+    try:
+        return ec2.describe_volumes(VolumeIds=chunk).get("Volumes", [])
+    except Exception:
+        return []
 
 
 def list_volumes(ec2, volume_ids: List[str]):
     if not volume_ids:
         return []
-    vols = []
-    for i in range(0, len(volume_ids), 200):
-        chunk = volume_ids[i:i+200]
-        try:
-            resp = ec2.describe_volumes(VolumeIds=chunk)
-        except Exception:
-            continue
-        vols.extend(resp.get("Volumes", []))
-    return vols
+    chunks = [volume_ids[i:i+200] for i in range(0, len(volume_ids), 200)]
+    # Chunks are independent lookups, so they are overlapped; 8 stays under the client's 10 pooled connections.
+    with ThreadPoolExecutor(max_workers=min(8, len(chunks))) as pool:
+        return [v for vols in pool.map(lambda c: describe_volume_chunk(ec2, c), chunks) for v in vols]
 
 
 def volume_cost_gb(vol: Dict[str, Any]):
@@ -135,40 +154,11 @@ def volume_cost_gb(vol: Dict[str, Any]):
     return size * GB_COST
 
 
-def main():
-    args = parse_args()
-    sess = session(args.profile)
-    regs = discover_regions(sess, args.regions)
-    needed_tags = parse_tag_filters(args.required_tag)
-    mark_k, mark_v = parse_mark(args.mark)
-
-    cutoff_days = args.stopped_days
-    now = dt.datetime.utcnow()
-
-    results = []
-    mark_count = 0
-
-    for region in regs:
-        ec2 = sess.client("ec2", region_name=region)
-        try:
-            instances = list_instances(ec2)
-        except Exception as e:
-            print(f"WARN region {region} list instances failed: {e}", file=sys.stderr)
-            continue
-        # Preload all volume IDs for stopped instances to estimate cost
-        volume_map = {}
-        for inst in instances:
-            if inst.get("State", {}).get("Name") != "stopped":
-                continue
-            for bd in inst.get("BlockDeviceMappings", []):
-                ebs = bd.get("Ebs")
-                if ebs and ebs.get("VolumeId"):
-                    volume_map[ebs["VolumeId"]] = None
-        volume_details = list_volumes(ec2, list(volume_map.keys()))
-        for v in volume_details:
-            volume_map[v.get("VolumeId")] = v
-
-        for inst in instances:
+def scan_region(args, ec2, region: str, needed_tags: Dict[str, str], now: dt.datetime) -> List[Dict[str, Any]]:
+    # One streaming pass over the instances; only the ones that pass every filter are kept.
+    candidates = []
+    try:
+        for inst in iter_instances(ec2):
             state = inst.get("State", {}).get("Name")
             if state != "stopped":
                 continue
@@ -189,32 +179,65 @@ def main():
             if launch and launch.tzinfo:
                 launch = launch.astimezone(dt.timezone.utc).replace(tzinfo=None)
             days = (now - launch).days if launch else None
-            if days is not None and days < cutoff_days:
+            if days is not None and days < args.stopped_days:
                 continue
-            # Collect volumes & cost
             volume_ids = [bd.get("Ebs", {}).get("VolumeId") for bd in inst.get("BlockDeviceMappings", []) if bd.get("Ebs")]
-            vols = [volume_map.get(vid) for vid in volume_ids if volume_map.get(vid)]
-            total_gb = sum(v.get("Size", 0) for v in vols)
-            est_cost = sum(volume_cost_gb(v) for v in vols)
-            rec = {
-                "region": region,
-                "instance_id": inst.get("InstanceId"),
-                "name": name,
-                "stopped_days": days,
-                "volumes_gb_total": total_gb,
-                "estimated_monthly_cost_usd": round(est_cost, 2),
-                "mark_attempted": False,
-                "mark_error": None,
-            }
-            if mark_k and mark_count < args.max_mark:
-                try:
-                    ec2.create_tags(Resources=[inst.get("InstanceId")], Tags=[{"Key": mark_k, "Value": mark_v}])
-                    rec["mark_attempted"] = True
-                    mark_count += 1
-                except Exception as e:
-                    rec["mark_attempted"] = True
-                    rec["mark_error"] = str(e)
-            results.append(rec)
+            candidates.append((inst.get("InstanceId"), name, days, volume_ids))
+    except Exception as e:
+        print(f"WARN region {region} list instances failed: {e}", file=sys.stderr)
+        return []
+
+    # Volumes are only looked up for flagged instances, to estimate their cost
+    volume_map = {vid: None for _, _, _, volume_ids in candidates for vid in volume_ids if vid}
+    for v in list_volumes(ec2, list(volume_map.keys())):
+        volume_map[v.get("VolumeId")] = v
+
+    out = []
+    for instance_id, name, days, volume_ids in candidates:
+        vols = [volume_map.get(vid) for vid in volume_ids if volume_map.get(vid)]
+        total_gb = sum(v.get("Size", 0) for v in vols)
+        est_cost = sum(volume_cost_gb(v) for v in vols)
+        out.append({
+            "region": region,
+            "instance_id": instance_id,
+            "name": name,
+            "stopped_days": days,
+            "volumes_gb_total": total_gb,
+            "estimated_monthly_cost_usd": round(est_cost, 2),
+            "mark_attempted": False,
+            "mark_error": None,
+        })
+    return out
+
+
+def main():
+    args = parse_args()
+    sess = session(args.profile)
+    regs = discover_regions(sess, args.regions, args.no_cache)
+    needed_tags = parse_tag_filters(args.required_tag)
+    mark_k, mark_v = parse_mark(args.mark)
+
+    cutoff_days = args.stopped_days
+    now = dt.datetime.utcnow()
+
+    results = []
+    mark_count = 0
+
+    clients = {r: sess.client("ec2", region_name=r) for r in regs}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(regs)))) as pool:
+        for region_results in pool.map(lambda r: scan_region(args, clients[r], r, needed_tags, now), regs):
+            for rec in region_results:
+                # Tags are applied serially here, in this thread, so --max-mark holds across regions.
+                if mark_k and mark_count < args.max_mark:
+                    try:
+                        clients[rec["region"]].create_tags(Resources=[rec["instance_id"]], Tags=[{"Key": mark_k, "Value": mark_v}])
+                        rec["mark_attempted"] = True
+                        mark_count += 1
+                    except Exception as e:
+                        rec["mark_attempted"] = True
+                        rec["mark_error"] = str(e)
+                results.append(rec)
 
     if args.json:
         print(json.dumps({
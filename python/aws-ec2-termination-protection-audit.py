@@ -1,14 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import boto3
+from botocore.config import Config
+
+# Pool sized above the worker count; adaptive retries back off client-side when throttled.
+ec2 = boto3.client('ec2', config=Config(max_pool_connections=64, retries={'mode': 'adaptive', 'max_attempts': 10}))
+
+def instance_ids():
+    # DescribeInstances is paginated; without it only the first page of instances was audited.
+    for page in ec2.get_paginator('describe_instances').paginate(PaginationConfig={'PageSize': 1000}):
+        for res in page['Reservations']:
+            for inst in res['Instances']:
+                yield inst['InstanceId']
 
-ec2 = boto3.client('ec2')
+def termination_protected(instance_id):
+    attr = ec2.describe_instance_attribute(InstanceId=instance_id, Attribute='disableApiTermination')
+    return attr['DisableApiTermination']['Value']
 
 def main():
-    reservations = ec2.describe_instances()['Reservations']
-    for res in reservations:
-        for inst in res['Instances']:
-            attr = ec2.describe_instance_attribute(InstanceId=inst['InstanceId'], Attribute='disableApiTermination')
-            if not attr['DisableApiTermination']['Value']:
-                print(f"Instance {inst['InstanceId']} does NOT have termination protection enabled.")
+    ids = list(instance_ids())
+    # The attribute is only available one instance per call, so the lookups are overlapped.
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        for instance_id, protected in zip(ids, pool.map(termination_protected, ids)):
+            if not protected:
+                print(f"Instance {instance_id} does NOT have termination protection enabled.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,18 +1,81 @@
-import boto3
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 
+import boto3
+
 THRESHOLD_DAYS = 7
-ec2 = boto3.client('ec2')
+REGION_CACHE_TTL = 24 * 3600
+# Every EC2 scheduled event code; instances without one are dropped server-side.
+EVENT_CODES = ['instance-reboot', 'system-reboot', 'system-maintenance', 'instance-retirement', 'instance-stop']
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Report EC2 instances with scheduled events coming up")
+    p.add_argument("--regions", nargs="*", help="Regions to scan (default: all enabled)")
+    p.add_argument("--no-cache", action="store_true", help="Refresh the cached enabled-region list")
+    return p.parse_args()
+
+def discover_regions(sess, explicit, no_cache=False):
+    if explicit:
+        return explicit
+    use_cache = not no_cache and os.environ.get("AUDITOR_NO_REGION_CACHE") != "1"
+    partition = sess.get_partition_for_region(sess.region_name or "us-east-1")
+    cache_path = os.path.expanduser(f"~/.cache/aws-audit/regions-{sess.profile_name}-{partition}.json")
+    if use_cache:
+        try:
+            if time.time() - os.path.getmtime(cache_path) < REGION_CACHE_TTL:
+                with open(cache_path) as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
+    try:
+        ec2 = sess.client("ec2")
+        resp = ec2.describe_regions(AllRegions=False)
+        found = sorted(r["RegionName"] for r in resp["Regions"])
+    except Exception:
+        return ["us-east-1"]
+    if os.environ.get("AUDITOR_NO_REGION_CACHE") != "1":
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(found, f)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass
+    return found
+
+def instance_statuses(region, client):
+    # DescribeInstanceStatus is paginated; a single call silently stopped at the first page.
+    pages = client.get_paginator('describe_instance_status').paginate(
+        IncludeAllInstances=True,
+        Filters=[{'Name': 'event.code', 'Values': EVENT_CODES}],
+        PaginationConfig={'PageSize': 1000},
+    )
+    try:
+        return [inst for page in pages for inst in page['InstanceStatuses']]
+    except Exception as e:
+        print(f"WARN region {region} describe_instance_status failed: {e}", file=sys.stderr)
+        return []
 
 def main():
+    args = parse_args()
     now = datetime.now(timezone.utc)
-    resp = ec2.describe_instance_status(IncludeAllInstances=True)
-    for inst in resp['InstanceStatuses']:
-        for event in inst.get('Events', []):
-            not_before = event['NotBefore']
-            days = (not_before - now).days
-            if days < THRESHOLD_DAYS:
-                print(f"Instance {inst['InstanceId']} has event {event['Code']} in {days} days (on {not_before})")
+    sess = boto3.Session()
+    regions = discover_regions(sess, args.regions, args.no_cache)
+    clients = [sess.client('ec2', region_name=r) for r in regions]
+    with ThreadPoolExecutor(max_workers=max(1, min(16, len(clients)))) as pool:
+        for region, statuses in zip(regions, pool.map(instance_statuses, regions, clients)):
+            for inst in statuses:
+                for event in inst.get('Events', []):
+                    not_before = event['NotBefore']
+                    days = (not_before - now).days
+                    if days < THRESHOLD_DAYS:
+                        print(f"Instance {inst['InstanceId']} in {region} has event {event['Code']} in {days} days (on {not_before})")
 
 if __name__ == "__main__":
     main()
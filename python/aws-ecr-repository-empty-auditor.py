@@ -24,6 +24,7 @@ Safety:
 
 Permissions:
   - ecr:DescribeRepositories, ecr:DescribeImages, ecr:ListTagsForResource, ecr:TagResource, ecr:DeleteRepository
+  - tag:GetResources (--required-tag; falls back to ecr:ListTagsForResource per repository)
   - cloudwatch not required (ECR API provides push times)
   - ec2:DescribeRegions
 
@@ -41,8 +42,17 @@ import argparse
 import boto3
 import datetime as dt
 import json
+import os
 import sys
-from typing import Any, Dict, List, Optional
+import time
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+# Larger pool for concurrent repository lookups; adaptive retries back off client-side when throttled.
+BOTO_CFG = Config(max_pool_connections=50, retries={"mode": "adaptive", "max_attempts": 10},
+                  user_agent_extra="audit-scripts/1.0")
+REGION_CACHE_TTL = 24 * 3600
 
 
 def parse_args():
@@ -60,6 +70,8 @@ def parse_args():
     p.add_argument("--max-delete", type=int, default=10, help="Max repositories to delete (default: 10)")
     p.add_argument("--ci-exit-on-findings", action="store_true", help="Exit code 2 if any findings (CI integration)")
     p.add_argument("--json", action="store_true", help="JSON output")
+    p.add_argument("--workers", type=int, default=16, help="Repositories inspected concurrently (default 16)")
+    p.add_argument("--no-cache", action="store_true", help="Refresh the cached enabled-region list")
     return p.parse_args()
 
 
@@ -69,15 +81,35 @@ def session(profile: Optional[str]):
     return boto3.Session()
 
 
-def discover_regions(sess, explicit):
+def discover_regions(sess, explicit, no_cache: bool = False):
     if explicit:
         return explicit
+    use_cache = not no_cache and os.environ.get("AUDITOR_NO_REGION_CACHE") != "1"
+    partition = sess.get_partition_for_region(sess.region_name or "us-east-1")
+    cache_path = os.path.expanduser(f"~/.cache/aws-audit/regions-{sess.profile_name}-{partition}.json")
+    if use_cache:
+        try:
+            if time.time() - os.path.getmtime(cache_path) < REGION_CACHE_TTL:
+                with open(cache_path) as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
     try:
-        ec2 = sess.client("ec2")
+        ec2 = sess.client("ec2", config=BOTO_CFG)
         resp = ec2.describe_regions(AllRegions=False)
-        return sorted(r["RegionName"] for r in resp["Regions"])
+        found = sorted(r["RegionName"] for r in resp["Regions"])
     except Exception:
         return ["us-east-1"]
+    if os.environ.get("AUDITOR_NO_REGION_CACHE") != "1":
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(found, f)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass
+    return found
 
 
 def parse_required_tags(required: Optional[List[str]]) -> Dict[str, str]:
@@ -115,6 +147,20 @@ def list_tags(ecr, arn: str) -> Dict[str, str]:
         return {}
 
 
+def tagged_repo_arns(tagging, needed: Dict[str, str]) -> Optional[Set[str]]:
+    """ARNs of repositories carrying every required tag, or None if the Tagging API is unavailable."""
+    arns: Set[str] = set()
+    try:
+        paginator = tagging.get_paginator("get_resources")
+        pages = paginator.paginate(ResourceTypeFilters=["ecr:repository"],
+                                   TagFilters=[{"Key": k, "Values": [v]} for k, v in needed.items()])
+        for page in pages:
+            arns.update(m.get("ResourceARN") for m in page.get("ResourceTagMappingList", []))
+    except Exception:
+        return None
+    return arns
+
+
 def repo_images_stats(ecr, repo_name: str) -> Dict[str, Any]:
     """Return image_count and last_pushed_at (UTC naive) for a repository."""
     image_count = 0
@@ -162,7 +208,7 @@ def delete_repo(ecr, name: str) -> Optional[str]:
 def main():
     args = parse_args()
     sess = session(args.profile)
-    regions = discover_regions(sess, args.regions)
+    regions = discover_regions(sess, args.regions, args.no_cache)
     needed_tags = parse_required_tags(args.required_tag)
 
     now = dt.datetime.utcnow()
@@ -171,72 +217,81 @@ def main():
     tagged = 0
     deleted = 0
 
-    for region in regions:
-        ecr = sess.client("ecr", region_name=region)
-        repos = list_repositories(ecr)
-        for r in repos:
-            name = r.get("repositoryName")
-            arn = r.get("repositoryArn") or name
-            if args.name_filter and (args.name_filter not in (name or "")):
-                continue
-            # Tag filter
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        for region in regions:
+            ecr = sess.client("ecr", region_name=region, config=BOTO_CFG)
+            # One server-side tag query per region instead of a ListTagsForResource call per repository.
+            tagged_arns = None
             if needed_tags:
-                tags = list_tags(ecr, arn)
-                ok = True
-                for k, v in needed_tags.items():
-                    if tags.get(k) != v:
-                        ok = False
-                        break
-                if not ok:
+                tagging = sess.client("resourcegroupstaggingapi", region_name=region, config=BOTO_CFG)
+                tagged_arns = tagged_repo_arns(tagging, needed_tags)
+            repos = []
+            for r in list_repositories(ecr):
+                name = r.get("repositoryName")
+                arn = r.get("repositoryArn") or name
+                if args.name_filter and (args.name_filter not in (name or "")):
+                    continue
+                # Tag filter
+                if tagged_arns is not None:
+                    if arn not in tagged_arns:
+                        continue
+                elif needed_tags:
+                    tags = list_tags(ecr, arn)
+                    ok = True
+                    for k, v in needed_tags.items():
+                        if tags.get(k) != v:
+                            ok = False
+                            break
+                    if not ok:
+                        continue
+                repos.append(r)
+
+            # Image listings are network-bound, so threads overlap them; map() keeps repository order.
+            # Tagging and deletion stay in this thread so --max-apply and --max-delete are exact.
+            for r, stats in zip(repos, pool.map(lambda r: repo_images_stats(ecr, r.get("repositoryName")), repos)):
+                name = r.get("repositoryName")
+                arn = r.get("repositoryArn") or name
+                count = int(stats.get("image_count") or 0)
+                last_push = stats.get("last_pushed_at")
+                days_since = (now - last_push).days if last_push else None
+
+                is_empty = count == 0
+                is_stale = days_since is not None and days_since >= args.min_days_since_push
+
+                flagged = is_empty or is_stale
+                if not flagged:
                     continue
 
-            stats = repo_images_stats(ecr, name)
-            count = int(stats.get("image_count") or 0)
-            last_push = stats.get("last_pushed_at")
-            days_since = (now - last_push).days if last_push else None
-
-            is_empty = count == 0
-            is_stale = (days_since is not None) and (days_since >= args.min_days_since_pus h)  # type: ignore
-            # Fix potential typo: We'll recompute safely
-            if last_push:
-                is_stale = (now - last_push).days >= args.min_days_since_push
-            else:
-                is_stale = False
-
-            flagged = is_empty or is_stale
-            if not flagged:
-                continue
-
-            rec = {
-                "region": region,
-                "name": name,
-                "arn": arn,
-                "image_count": count,
-                "last_push": last_push.isoformat() if last_push else None,
-                "days_since_push": days_since,
-                "flag_empty": is_empty,
-                "flag_stale": is_stale,
-                "tag_attempted": False,
-                "tag_error": None,
-                "delete_attempted": False,
-                "delete_error": None,
-            }
-
-            if args.apply_tag and arn and tagged < args.max_apply:
-                err = add_tag(ecr, arn, args.tag_key, args.tag_value)
-                rec["tag_attempted"] = True
-                rec["tag_error"] = err
-                if err is None:
-                    tagged += 1
-
-            if args.apply_delete and is_empty and deleted < args.max_delete:
-                err = delete_repo(ecr, name)
-                rec["delete_attempted"] = True
-                rec["delete_error"] = err
-                if err is None:
-                    deleted += 1
-
-            findings.append(rec)
+                rec = {
+                    "region": region,
+                    "name": name,
+                    "arn": arn,
+                    "image_count": count,
+                    "last_push": last_push.isoformat() if last_push else None,
+                    "days_since_push": days_since,
+                    "flag_empty": is_empty,
+                    "flag_stale": is_stale,
+                    "tag_attempted": False,
+                    "tag_error": None,
+                    "delete_attempted": False,
+                    "delete_error": None,
+                }
+
+                if args.apply_tag and arn and tagged < args.max_apply:
+                    err = add_tag(ecr, arn, args.tag_key, args.tag_value)
+                    rec["tag_attempted"] = True
+                    rec["tag_error"] = err
+                    if err is None:
+                        tagged += 1
+
+                if args.apply_delete and is_empty and deleted < args.max_delete:
+                    err = delete_repo(ecr, name)
+                    rec["delete_attempted"] = True
+                    rec["delete_error"] = err
+                    if err is None:
+                        deleted += 1
+
+                findings.append(rec)
 
     payload = {
         "regions": regions,
@@ -34,9 +34,20 @@ import argparse
 import boto3
 import datetime as dt
 import json
+import os
 import sys
+import time
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
+# Sized for --workers repositories each running CHUNK_WORKERS requests; adaptive retries back off when throttled.
+BOTO_CFG = Config(max_pool_connections=64, retries={"mode": "adaptive", "max_attempts": 10},
+                  user_agent_extra="audit-scripts/1.0")
+# 100-image chunks of one repository in flight at once
+CHUNK_WORKERS = 4
+REGION_CACHE_TTL = 24 * 3600
+
 
 def parse_args():
     p = argparse.ArgumentParser(description="Prune (delete) old untagged ECR images (dry-run by default)")
@@ -47,6 +58,8 @@ def parse_args():
     p.add_argument("--max-delete", type=int, default=200, help="Max images to delete per repository per run")
     p.add_argument("--apply", action="store_true", help="Actually delete instead of dry-run")
     p.add_argument("--json", action="store_true", help="Output JSON")
+    p.add_argument("--workers", type=int, default=16, help="Repositories processed concurrently (default 16)")
+    p.add_argument("--no-cache", action="store_true", help="Refresh the cached enabled-region list")
     return p.parse_args()
 
 
@@ -56,15 +69,35 @@ def session(profile: Optional[str]):
     return boto3.Session()
 
 
-def regions(sess, explicit):
+def regions(sess, explicit, no_cache: bool = False):
     if explicit:
         return explicit
+    use_cache = not no_cache and os.environ.get("AUDITOR_NO_REGION_CACHE") != "1"
+    partition = sess.get_partition_for_region(sess.region_name or "us-east-1")
+    cache_path = os.path.expanduser(f"~/.cache/aws-audit/regions-{sess.profile_name}-{partition}.json")
+    if use_cache:
+        try:
+            if time.time() - os.path.getmtime(cache_path) < REGION_CACHE_TTL:
+                with open(cache_path) as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
     try:
         ec2 = sess.client("ec2")
-        r = ec2.describe_regions(AllRegions=False)
-        return sorted([x["RegionName"] for x in r["Regions"]])
+        resp = ec2.describe_regions(AllRegions=False)
+        found = sorted(r["RegionName"] for r in resp["Regions"])
     except Exception:
         return ["us-east-1"]
+    if os.environ.get("AUDITOR_NO_REGION_CACHE") != "1":
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(found, f)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass
+    return found
 
 
 def list_repositories(ecr):
@@ -101,6 +134,15 @@ def list_untagged_image_digests(ecr, repo_name: str):
     return digests
 
 
+def map_chunks(fn, items: List[Dict[str, str]], size: int = 100) -> List[Any]:
+    """Apply fn to each `size`-item chunk, CHUNK_WORKERS chunks at a time; results come back in chunk order."""
+    chunks = [items[i:i+size] for i in range(0, len(items), size)]
+    if len(chunks) <= 1:
+        return [fn(c) for c in chunks]
+    with ThreadPoolExecutor(max_workers=min(CHUNK_WORKERS, len(chunks))) as pool:
+        return list(pool.map(fn, chunks))
+
+
 def batch_get_images(ecr, repo_name: str, digests: List[Dict[str, str]]):
     out = []
     for i in range(0, len(digests), 100):
@@ -114,28 +156,28 @@ def batch_get_images(ecr, repo_name: str, digests: List[Dict[str, str]]):
 
 
 def describe_images(ecr, repo_name: str, digests: List[Dict[str, str]]):
-    images = []
-    for i in range(0, len(digests), 100):
-        chunk = digests[i:i+100]
+    def describe_chunk(chunk):
         try:
-            resp = ecr.describe_images(repositoryName=repo_name, imageIds=chunk)
+            return ecr.describe_images(repositoryName=repo_name, imageIds=chunk).get("imageDetails", [])
         except Exception:
-            continue
-        images.extend(resp.get("imageDetails", []))
-    return images
+            return []
+
+    return [d for details in map_chunks(describe_chunk, digests) for d in details]
 
 
 def batch_delete(ecr, repo_name: str, digests: List[Dict[str, str]]):
-    deleted = []
-    failures = []
-    for i in range(0, len(digests), 100):
-        chunk = digests[i:i+100]
+    def delete_chunk(chunk):
         try:
             resp = ecr.batch_delete_image(repositoryName=repo_name, imageIds=chunk)
-            deleted.extend(resp.get("imageIds", []))
-            failures.extend(resp.get("failures", []))
+            return resp.get("imageIds", []), resp.get("failures", [])
         except Exception as e:
-            failures.append({"reason": str(e), "imageIds": chunk})
+            return [], [{"reason": str(e), "imageIds": chunk}]
+
+    deleted = []
+    failures = []
+    for ok, failed in map_chunks(delete_chunk, digests):
+        deleted.extend(ok)
+        failures.extend(failed)
     return deleted, failures
 
 
@@ -147,66 +189,73 @@ def human_size(num: float) -> str:
     return f"{num:.1f}PB"
 
 
+def process_repo(args, ecr, region: str, name: str, cutoff: dt.datetime) -> Optional[Dict[str, Any]]:
+    digests = list_untagged_image_digests(ecr, name)
+    if not digests:
+        return None
+    details = describe_images(ecr, name, digests)
+    old_images = []
+    for d in details:
+        pushed = d.get("imagePushedAt")
+        if not pushed:
+            continue
+        if pushed.tzinfo:
+            pushed = pushed.astimezone(dt.timezone.utc).replace(tzinfo=None)
+        if pushed > cutoff:
+            continue
+        if d.get("imageTags"):
+            continue  # safety
+        old_images.append(d)
+    if not old_images:
+        return None
+    # Sort by age ascending so we prune oldest first (arbitrary)
+    old_images.sort(key=lambda x: x.get("imagePushedAt"))
+    to_delete = [{"imageDigest": im.get("imageDigest") or ""} for im in old_images][:args.max_delete]
+    deleted = []
+    failures = []
+    if args.apply:
+        deleted, failures = batch_delete(ecr, name, to_delete)
+    size_sum = 0
+    for img in old_images:
+        # size may be missing; accumulate if present
+        size_sum += img.get("imageSizeInBytes", 0)
+    return {
+        "region": region,
+        "repository": name,
+        "total_old_untagged": len(old_images),
+        "deleted_attempted": len(to_delete) if args.apply else 0,
+        "deleted": len(deleted),
+        "failures": failures,
+        "size_reclaimable_bytes": size_sum,
+        "size_reclaimable_human": human_size(size_sum),
+        "apply": args.apply,
+        "sample_digests": [i.get("imageDigest") for i in old_images[:5]],
+    }
+
+
 def main():
     args = parse_args()
     sess = session(args.profile)
-    regs = regions(sess, args.regions)
+    regs = regions(sess, args.regions, args.no_cache)
     cutoff = dt.datetime.utcnow() - dt.timedelta(days=args.days)
     all_results = []
 
-    for region in regs:
-        ecr = sess.client("ecr", region_name=region)
-        try:
-            repos = list_repositories(ecr)
-        except Exception as e:
-            print(f"WARN region {region} describe_repositories failed: {e}", file=sys.stderr)
-            continue
-        for repo in repos:
-            name = repo.get("repositoryName")
-            if args.repo_filter and args.repo_filter not in name:
-                continue
-            digests = list_untagged_image_digests(ecr, name)
-            if not digests:
-                continue
-            details = describe_images(ecr, name, digests)
-            old_images = []
-            for d in details:
-                pushed = d.get("imagePushedAt")
-                if not pushed:
-                    continue
-                if pushed.tzinfo:
-                    pushed = pushed.astimezone(dt.timezone.utc).replace(tzinfo=None)
-                if pushed > cutoff:
-                    continue
-                if d.get("imageTags"):
-                    continue  # safety
-                old_images.append(d)
-            if not old_images:
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        for region in regs:
+            ecr = sess.client("ecr", region_name=region, config=BOTO_CFG)
+            try:
+                repos = list_repositories(ecr)
+            except Exception as e:
+                print(f"WARN region {region} describe_repositories failed: {e}", file=sys.stderr)
                 continue
-            # Sort by age ascending so we prune oldest first (arbitrary)
-            old_images.sort(key=lambda x: x.get("imagePushedAt"))
-            to_delete = [{"imageDigest": im.get("imageDigest") or ""} for im in old_images][:args.max_delete]
-            deleted = []
-            failures = []
-            if args.apply:
-                deleted, failures = batch_delete(ecr, name, to_delete)
-            size_sum = 0
-            for img in old_images:
-                # size may be missing; accumulate if present
-                size_sum += img.get("imageSizeInBytes", 0)
-            rec = {
-                "region": region,
-                "repository": name,
-                "total_old_untagged": len(old_images),
-                "deleted_attempted": len(to_delete) if args.apply else 0,
-                "deleted": len(deleted),
-                "failures": failures,
-                "size_reclaimable_bytes": size_sum,
-                "size_reclaimable_human": human_size(size_sum),
-                "apply": args.apply,
-                "sample_digests": [i.get("imageDigest") for i in old_images[:5]],
-            }
-            all_results.append(rec)
+            names = [r.get("repositoryName") for r in repos]
+            if args.repo_filter:
+                names = [n for n in names if args.repo_filter in n]
+            # Each repository's list/describe/delete chain is independent and network-bound, so
+            # repositories are processed concurrently; --max-delete is per repository, so no shared cap.
+            for rec in pool.map(lambda n: process_repo(args, ecr, region, n, cutoff), names):
+                if rec:
+                    all_results.append(rec)
 
     if args.json:
         print(json.dumps({
@@ -37,6 +37,7 @@ Notes:
 """
 from __future__ import annotations
 import argparse
+import datetime as dt
 import json
 import os
 import re
@@ -86,9 +87,8 @@ def filter_services(all_units: List[str], services_arg: str | None, pattern: str
             s = s.strip()
             if s:
                 chosen.add(s if s.endswith('.service') else s + '.service')
-    import fnmatch, re as _re
     if pattern:
-        rx = _re.compile(pattern)
+        rx = re.compile(pattern)
         for u in all_units:
             if rx.search(u):
                 chosen.add(u)
@@ -111,7 +111,6 @@ def parse_timestamp(line: str) -> Optional[float]:
     # short-iso begins with: YYYY-MM-DD HH:MM:SS
     try:
         ts_str = line[:19]
-        import datetime as dt
         dt_obj = dt.datetime.strptime(ts_str, "%Y-%m-%d %H:%M:%S")
         return dt_obj.timestamp()
     except Exception: